@@ -0,0 +1,190 @@
+import collections
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+
+# Words that do not change what a question is about. Two questions only share an
+# answer if their remaining key terms are the same, so "when do I take my
+# Paracetamol" can never be answered from "when do I take my Augmentin".
+STOPWORDS = {
+    "a", "about", "am", "an", "and", "are", "for", "i", "in", "is", "it", "me", "my", "of", "on",
+    "please", "s", "tell", "the", "to", "with", "you",
+}
+
+# Question words and modal verbs decide what kind of answer is wanted ("when do I
+# take X" is not "can I take X"), so they stay key terms. Only true synonyms are merged.
+QUESTION_WORDS = {
+    "can", "could", "do", "does", "how", "should", "what", "whats", "when", "where", "which",
+    "who", "why", "will", "would",
+}
+QUESTION_SYNONYMS = {"does": "do", "should": "do", "whats": "what", "could": "can", "would": "will"}
+
+def normalize_query(query):
+    """Lowercases, drops punctuation and collapses whitespace."""
+    return " ".join(re.sub(r"[^a-z0-9\s]", " ", query.lower().replace("'", "")).split())
+
+def key_terms(normalized_query):
+    terms = set()
+    for word in normalized_query.split():
+        if word in QUESTION_WORDS:
+            terms.add(QUESTION_SYNONYMS.get(word, word))
+        elif word not in STOPWORDS:
+            terms.add(word.rstrip("s"))
+    return frozenset(terms)
+
+# Words that make a question refer back to the conversation ("tell me more", "is that serious")
+FOLLOW_UP_WORDS = {"again", "else", "it", "its", "more", "that", "them", "these", "they", "this", "those"}
+
+def is_follow_up(normalized_query):
+    """Whether the answer depends on earlier turns: nothing but question words left, or a word that refers back."""
+    words = normalized_query.split()
+    return all(word in STOPWORDS or word in QUESTION_WORDS for word in words) or any(word in FOLLOW_UP_WORDS for word in words)
+
+def context_key(context, scope=None):
+    """Hash of the user (or session) and the analysis context; answers are only shared when both are identical."""
+    return hashlib.sha256(json.dumps({"scope": scope, "context": context}, sort_keys=True).encode("utf-8")).hexdigest()
+
+class HashingEmbedder:
+    """Small CPU embedding: hashed word and character-trigram counts, L2-normalized.
+
+    Stopwords and question words get a low weight and no trigrams, so phrasing
+    matters less than what the question is about; question words must match
+    through key_terms() anyway. Vectors are sparse dicts of {dimension: weight},
+    so similarity is a dot product.
+    """
+
+    def __init__(self, dimensions=4096):
+        self.dimensions = dimensions
+
+    def _index(self, feature):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest()
+        return int.from_bytes(digest, "little") % self.dimensions
+
+    def embed(self, normalized_query):
+        counts = collections.Counter()
+        for word in normalized_query.split():
+            if word in STOPWORDS or word in QUESTION_WORDS:
+                counts[self._index("w:" + QUESTION_SYNONYMS.get(word, word))] += 0.5
+                continue
+            counts[self._index("w:" + word)] += 2.0
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                counts[self._index("c:" + padded[i:i + 3])] += 1.0
+
+        norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+        return {k: v / norm for k, v in counts.items()}
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(k, 0.0) for k, weight in a.items())
+
+class SemanticAnswerCache:
+    """In-process cache of voice assistant answers, matched by query similarity.
+
+    Entries are partitioned by a hash of the user and the analysis context,
+    so an answer produced for one user or patient is never returned for
+    another's. Follow-up questions ("tell me more", "what should I do") depend
+    on the conversation so far and bypass the cache entirely. Within
+    a partition a lookup first tries the exact normalized query, then the most
+    similar cached query above `threshold` that has the same key terms.
+    Entries expire after `ttl_seconds` and the least recently used entry is
+    evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, embedder=None, threshold=0.85, ttl_seconds=24 * 3600, max_entries=1000):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.partitions = collections.defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _remove(self, key):
+        self.entries.pop(key, None)
+        partition = self.partitions.get(key[0])
+        if partition is not None:
+            partition.discard(key)
+            if not partition:
+                del self.partitions[key[0]]
+
+    def _lookup(self, ctx, normalized):
+        now = time.monotonic()
+        exact = (ctx, normalized)
+        if exact in self.entries:
+            if self.entries[exact]["expires"] > now:
+                return exact
+            self._remove(exact)
+
+        vector = self.embedder.embed(normalized)
+        terms = key_terms(normalized)
+        best_key, best_score = None, self.threshold
+        for key in list(self.partitions.get(ctx, ())):
+            entry = self.entries[key]
+            if entry["expires"] <= now:
+                self._remove(key)
+                continue
+            if entry["terms"] != terms:
+                continue
+            score = cosine(vector, entry["vector"])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def get(self, query, context=None, scope=None):
+        """Returns the cached {"full", "concise"} answer for a query, or None."""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+
+        with self.lock:
+            if is_follow_up(normalized):
+                self.skipped += 1
+                return None
+            key = self._lookup(context_key(context, scope), normalized)
+            if key is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return dict(self.entries[key]["answer"])
+
+    def put(self, query, answer, context=None, scope=None):
+        normalized = normalize_query(query)
+        if not normalized or is_follow_up(normalized):
+            return
+
+        key = (context_key(context, scope), normalized)
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = {
+                "answer": dict(answer),
+                "vector": self.embedder.embed(normalized),
+                "terms": key_terms(normalized),
+                "expires": time.monotonic() + self.ttl_seconds,
+            }
+            self.partitions[key[0]].add(key)
+
+            while len(self.entries) > self.max_entries:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped_follow_ups": self.skipped,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self.entries),
+            "evictions": self.evictions,
+        }
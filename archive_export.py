@@ -0,0 +1,314 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import shutil
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from confidence import parse_confidence
+from reminders import format_timings
+
+# Streams the JSON records under data/ into partitioned Parquet datasets:
+#   data/exports/<kind>/record_month=YYYY-MM/part-<run>.parquet
+# Files are read one at a time through a generator pipeline and written in
+# batches, so memory use depends on the batch size, not the archive size.
+
+DATA_DIR = "data"
+EXPORT_DIR = os.path.join("data", "exports")
+STATE_FILE = "export_state.json"
+# Incremental runs also rescan files whose mtime is up to this much older than
+# the previous run, since file timestamps can lag the clock read by time.time_ns()
+MTIME_MARGIN_NS = 2 * 10**9
+
+ARCHIVE_KINDS = {
+    "prescriptions": "prescriptions",
+    "diagnostics": "diagnostics",
+    "voice_conversations": "voice_conversations",
+}
+
+SCHEMAS = {
+    "prescriptions": pa.schema([
+        ("source_file", pa.string()),
+        ("record_time", pa.timestamp("s")),
+        ("prescription_date", pa.string()),
+        ("patient_name", pa.string()),
+        ("patient_age", pa.string()),
+        ("medicine_type", pa.string()),
+        ("medicine", pa.string()),
+        ("extracted_medicine", pa.string()),
+        ("dosage", pa.string()),
+        ("timing", pa.string()),
+    ]),
+    "diagnostics": pa.schema([
+        ("source_file", pa.string()),
+        ("record_time", pa.timestamp("s")),
+        ("predicted_disease", pa.string()),
+        ("confidence_score", pa.float32()),
+        ("description", pa.string()),
+        ("possible_causes", pa.list_(pa.string())),
+        ("recommended_actions", pa.list_(pa.string())),
+    ]),
+    "voice_conversations": pa.schema([
+        ("source_file", pa.string()),
+        ("record_time", pa.timestamp("s")),
+        ("turn_index", pa.int32()),
+        ("role", pa.string()),
+        ("content", pa.string()),
+        ("turn_time", pa.string()),
+    ]),
+}
+
+FILENAME_TIMESTAMP = re.compile(r"(\d{8}_\d{6})")
+
+def record_time(path, mtime):
+    """Timestamp from a name like prescription_20250227_164720.json, falling back to the file's mtime."""
+    match = FILENAME_TIMESTAMP.search(os.path.basename(path))
+    if match:
+        try:
+            return datetime.datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+        except ValueError:
+            pass
+    return datetime.datetime.fromtimestamp(mtime).replace(microsecond=0)
+
+def as_text_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [str(value)]
+
+# ---------------------------------------------------------------------------
+# Pipeline stages
+# ---------------------------------------------------------------------------
+
+def scan_archive(data_dir, since_ns=0, exported=None):
+    """Yields (kind, path, mtime_ns) for archive files modified after since_ns.
+
+    JSON records found in `exported` ({path: mtime_ns}) with the same mtime
+    were exported already and are skipped.
+    """
+    exported = exported or {}
+    for kind, subdir in ARCHIVE_KINDS.items():
+        directory = os.path.join(data_dir, subdir)
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith((".json", ".jsonl")):
+                    continue
+                mtime_ns = entry.stat().st_mtime_ns
+                if mtime_ns > since_ns and exported.get(entry.path) != mtime_ns:
+                    yield kind, entry.path, mtime_ns
+
+def read_records(files, jsonl_offsets, errors):
+    """Yields (kind, path, mtime_ns, data).
+
+    JSONL session files keep growing, so they are read from the
+    [byte offset, turn count] reached by the previous run.
+    """
+    for kind, path, mtime_ns in files:
+        try:
+            if path.endswith(".jsonl"):
+                offset, first_index = jsonl_offsets.get(path, (0, 0))
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    turns = [json.loads(line) for line in f if line.strip()]
+                    jsonl_offsets[path] = (f.tell(), first_index + len(turns))
+                yield kind, path, mtime_ns, {"turns": turns, "first_index": first_index}
+            else:
+                with open(path, "r") as f:
+                    yield kind, path, mtime_ns, json.load(f)
+        except (OSError, ValueError) as e:
+            errors.append(f"{path}: {e}")
+
+def prescription_rows(source, when, data):
+    patient = data.get("Patient") or {}
+    for med in data.get("Medicines") or []:
+        try:
+            timings = format_timings(med.get("Timings") or [])
+        except ValueError:
+            timings = [str(t) for t in med.get("Timings") or []]
+        for timing in timings or [None]:
+            yield {
+                "source_file": source,
+                "record_time": when,
+                "prescription_date": data.get("Date"),
+                "patient_name": patient.get("Name"),
+                "patient_age": str(patient.get("Age")) if patient.get("Age") is not None else None,
+                "medicine_type": med.get("Type"),
+                "medicine": med.get("Medicine"),
+                "extracted_medicine": med.get("Extracted_Medicine", med.get("Medicine")),
+                "dosage": med.get("Dosage"),
+                "timing": timing,
+            }
+
+def diagnostic_rows(source, when, data):
+    yield {
+        "source_file": source,
+        "record_time": when,
+        "predicted_disease": data.get("Predicted_Disease"),
+        "confidence_score": parse_confidence(data.get("Confidence_Score")),
+        "description": data.get("Description"),
+        "possible_causes": as_text_list(data.get("Possible_Causes")),
+        "recommended_actions": as_text_list(data.get("Recommended_Actions")),
+    }
+
+def voice_rows(source, when, data):
+    # Older saves are a JSON list of turns; sessions since the JSONL history are read incrementally
+    if isinstance(data, list):
+        turns, first_index = data, 0
+    else:
+        turns, first_index = data["turns"], data["first_index"]
+    for i, turn in enumerate(turns, first_index):
+        yield {
+            "source_file": source,
+            "record_time": when,
+            "turn_index": i,
+            "role": turn.get("role"),
+            "content": turn.get("content"),
+            "turn_time": turn.get("timestamp"),
+        }
+
+ROW_BUILDERS = {
+    "prescriptions": prescription_rows,
+    "diagnostics": diagnostic_rows,
+    "voice_conversations": voice_rows,
+}
+
+def flatten(records, data_dir, errors):
+    """Yields (kind, row) for every row of every record; records with an unexpected shape are skipped."""
+    for kind, path, mtime_ns, data in records:
+        source = os.path.relpath(path, data_dir)
+        when = record_time(path, mtime_ns / 1e9)
+        try:
+            rows = list(ROW_BUILDERS[kind](source, when, data))
+        except (AttributeError, KeyError, TypeError) as e:
+            errors.append(f"{path}: unexpected record layout ({e})")
+            continue
+        for row in rows:
+            yield kind, row
+
+class PartitionedWriter:
+    """Buffers rows per (kind, month) and appends them to one Parquet file per partition and run."""
+
+    def __init__(self, export_dir, run_id, batch_size):
+        self.export_dir = export_dir
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.writers = {}
+        self.rows_written = 0
+
+    def add(self, kind, row):
+        key = (kind, row["record_time"].strftime("%Y-%m"))
+        buffer = self.buffers.setdefault(key, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self._flush(key)
+
+    def _flush(self, key):
+        rows = self.buffers.pop(key, None)
+        if not rows:
+            return
+        kind, month = key
+        if key not in self.writers:
+            directory = os.path.join(self.export_dir, kind, f"record_month={month}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{self.run_id}.parquet")
+            self.writers[key] = pq.ParquetWriter(path, SCHEMAS[kind], compression="zstd")
+        self.writers[key].write_table(pa.Table.from_pylist(rows, schema=SCHEMAS[kind]))
+        self.rows_written += len(rows)
+
+    def close(self):
+        for key in list(self.buffers):
+            self._flush(key)
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+# ---------------------------------------------------------------------------
+# Export and read
+# ---------------------------------------------------------------------------
+
+def load_state(export_dir):
+    try:
+        with open(os.path.join(export_dir, STATE_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"last_run_ns": 0, "jsonl_offsets": {}, "exported": {}}
+
+def save_state(export_dir, state):
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+def export_archive(data_dir=DATA_DIR, export_dir=EXPORT_DIR, batch_size=10000, full=False):
+    """Exports files added or changed since the last run (or everything with full=True). Returns run stats."""
+    if full:
+        # A full export replaces the datasets instead of adding duplicate rows to them
+        for kind in ARCHIVE_KINDS:
+            shutil.rmtree(os.path.join(export_dir, kind), ignore_errors=True)
+        state = {"last_run_ns": 0, "jsonl_offsets": {}, "exported": {}}
+    else:
+        state = load_state(export_dir)
+    exported = state.setdefault("exported", {})
+    # Anything modified from here on is picked up by the next run
+    run_started_ns = time.time_ns()
+    run_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+    stats = {"files": 0, "rows": 0, "errors": []}
+
+    def counted(files):
+        for kind, path, mtime_ns in files:
+            stats["files"] += 1
+            # JSONL sessions are read from their offsets instead, so rescanning them adds no rows
+            if not path.endswith(".jsonl"):
+                exported[path] = mtime_ns
+            yield kind, path, mtime_ns
+
+    start = time.perf_counter()
+    since_ns = max(0, state["last_run_ns"] - MTIME_MARGIN_NS)
+    files = counted(scan_archive(data_dir, since_ns, dict(exported)))
+    records = read_records(files, state["jsonl_offsets"], stats["errors"])
+    writer = PartitionedWriter(export_dir, run_id, batch_size)
+    try:
+        for kind, row in flatten(records, data_dir, stats["errors"]):
+            writer.add(kind, row)
+    finally:
+        writer.close()
+
+    stats["rows"] = writer.rows_written
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    state["last_run_ns"] = run_started_ns
+    # Only files inside the next run's rescan window need remembering
+    state["exported"] = {path: mtime_ns for path, mtime_ns in exported.items()
+                         if mtime_ns > run_started_ns - MTIME_MARGIN_NS}
+    save_state(export_dir, state)
+    return stats
+
+def read_export(kind, export_dir=EXPORT_DIR, columns=None, filters=None):
+    """Loads an exported dataset into pandas through memory-mapped Parquet reads."""
+    path = os.path.join(export_dir, kind)
+    return pq.read_table(path, columns=columns, filters=filters, memory_map=True).to_pandas()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the data/ archive to partitioned Parquet.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--export-dir", default=EXPORT_DIR)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--full", action="store_true", help="Re-export everything instead of only new files")
+    args = parser.parse_args()
+
+    stats = export_archive(args.data_dir, args.export_dir, args.batch_size, args.full)
+    print(f"Exported {stats['rows']} rows from {stats['files']} files in {stats['seconds']}s to {args.export_dir}")
+    for error in stats["errors"]:
+        print(f"Skipped {error}")
+
+if __name__ == "__main__":
+    main()
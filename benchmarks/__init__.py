@@ -0,0 +1 @@
+"""Offline benchmark suite for Mediclock. Run with `python -m benchmarks.run_benchmarks`."""
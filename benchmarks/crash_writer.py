@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import threading
+
+from storage import GroupCommitWriter, atomic_write_json
+
+# Child process for the durable_writes benchmark; it writes until it is killed.
+#
+#   python -m benchmarks.crash_writer <mode> <directory>
+#
+#   plain   rewrites users.json in place, the way save_users() used to
+#   atomic  rewrites users.json with atomic_write_json()
+#   group   saves numbered records from several threads through a GroupCommitWriter
+#
+# Prints "ready" once writing starts and "ack <name>" after each write returns,
+# so the parent knows which writes were acknowledged before the crash.
+
+USERS = {f"user{i}": f"password{i}" for i in range(20000)}
+RECORD = {"Predicted_Disease": "Benchmark", "Confidence_Score": "80%", "Description": "x" * 1024}
+
+print_lock = threading.Lock()
+
+def report(line):
+    with print_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+def rewrite_users(directory, atomic):
+    path = os.path.join(directory, "users.json")
+    for i in range(sys.maxsize):
+        users = dict(USERS, last=str(i))
+        if atomic:
+            atomic_write_json(path, users)
+        else:
+            with open(path, "w") as f:
+                json.dump(users, f)
+        report(f"ack {i}")
+
+def write_records(directory, threads=8):
+    writer = GroupCommitWriter(os.path.join(directory, ".journal.jsonl"))
+
+    def worker(t):
+        for n in range(sys.maxsize):
+            name = f"record_{t}_{n}.json"
+            writer.write(os.path.join(directory, name), dict(RECORD, Sequence=n), indent=4)
+            report(f"ack {name}")
+
+    workers = [threading.Thread(target=worker, args=(t,), daemon=True) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+def main():
+    mode, directory = sys.argv[1], sys.argv[2]
+    report("ready")
+    if mode == "group":
+        write_records(directory)
+    else:
+        rewrite_users(directory, atomic=mode == "atomic")
+
+if __name__ == "__main__":
+    main()
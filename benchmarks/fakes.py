@@ -0,0 +1,491 @@
+import io
+import json
+import math
+import os
+import socketserver
+import sys
+import threading
+import time
+import types
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+import speech_recognition as sr
+
+from notifications import Channel
+from reminders import load_prescription, due_medicines
+
+# Deterministic stand-ins for everything the app normally needs a network,
+# microphone, display or sound card for. Used only by the benchmark suite.
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = REPO_ROOT / "data"
+
+
+def _load_sample(path, default):
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return json.dumps(default)
+
+
+DEFAULT_RESPONSES = {
+    "prescription": _load_sample(
+        DATA_DIR / "prescriptions" / "prescription_20250313_153523.json",
+        {"Date": "", "Patient": {"Name": "Test Patient", "Age": "30"}, "Medicines": []},
+    ),
+    "diagnostic": _load_sample(
+        DATA_DIR / "diagnostics" / "diagnostic_20250313_153619.json",
+        {"Predicted_Disease": "Unknown", "Confidence_Score": 50},
+    ),
+    "chat": (
+        "Paracetamol is usually taken every four to six hours as needed. "
+        "Do not take more than the dose on your prescription. "
+        "Ask your doctor if the pain lasts more than three days."
+    ),
+    "summary": "Take Paracetamol every four to six hours, as prescribed.",
+}
+
+
+# ---------------------------------------------------------------------------
+# Together
+# ---------------------------------------------------------------------------
+
+def classify_messages(messages):
+    """Works out which kind of request a chat.completions payload is."""
+    for msg in messages:
+        content = msg.get("content")
+        if isinstance(content, list):
+            prompt = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+            return "prescription" if "prescription" in prompt.lower() else "diagnostic"
+    if messages and "summarizer" in str(messages[0].get("content", "")).lower():
+        return "summary"
+    return "chat"
+
+
+class FakeTogether:
+    """Drop-in for `together.Together` with configurable latency and canned replies.
+
+    `latency` is the base delay per call in seconds. `model_latency` and
+    `model_failure_rate` override it per model name, which lets a scenario
+    simulate one slow or failing endpoint. Failures are deterministic: a model
+    with failure rate 0.25 fails every fourth call.
+    """
+
+    def __init__(self, latency=0.0, responses=None, model_latency=None, model_failure_rate=None):
+        self.latency = latency
+        self.responses = dict(DEFAULT_RESPONSES, **(responses or {}))
+        self.model_latency = model_latency or {}
+        self.model_failure_rate = model_failure_rate or {}
+        self.calls = []
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        kind = classify_messages(messages)
+        with self._lock:
+            count = self._counts.get(model, 0) + 1
+            self._counts[model] = count
+            self.calls.append({"model": model, "kind": kind})
+
+        time.sleep(self.model_latency.get(model, self.latency))
+
+        failure_rate = self.model_failure_rate.get(model, 0.0)
+        if failure_rate and count % max(1, round(1 / failure_rate)) == 0:
+            raise RuntimeError(f"Simulated failure from {model}")
+
+        message = SimpleNamespace(content=self.responses[kind])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], model=model)
+
+
+class FakeTogetherServer:
+    """Local HTTP stand-in for the Together API, backed by a FakeTogether.
+
+    Point the real client at it with TOGETHER_BASE_URL=<server.base_url>.
+    Simulated failures come back as HTTP 503.
+    """
+
+    def __init__(self, fake=None, host="127.0.0.1", port=0):
+        self.fake = fake or FakeTogether()
+        fake_client = self.fake
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                try:
+                    response = fake_client.chat.completions.create(model=body.get("model"), messages=body.get("messages", []))
+                    status, payload = 200, {
+                        "id": "fake",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": response.model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": response.choices[0].message.content}}],
+                    }
+                except RuntimeError as e:
+                    status, payload = 503, {"error": {"message": str(e)}}
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.base_url = f"http://{host}:{self.httpd.server_port}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Microphone / speech recognition
+# ---------------------------------------------------------------------------
+
+def write_test_wav(path, seconds=2.0, rate=16000):
+    """Writes a deterministic WAV with a short silence followed by a tone burst."""
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        amplitude = 0 if t < 0.5 else 8000
+        sample = int(amplitude * math.sin(2 * math.pi * 220 * t))
+        frames += sample.to_bytes(2, "little", signed=True)
+
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(frames))
+    return path
+
+
+class FakeMicrophone(sr.AudioFile):
+    """Replays a WAV file wherever the app opens `sr.Microphone()`."""
+
+    wav_path = None
+
+    def __init__(self, device_index=None, sample_rate=None, chunk_size=1024):
+        super().__init__(str(self.wav_path))
+
+
+def fake_recognize_google(transcript):
+    """Returns a recognize_google replacement that always hears `transcript`."""
+    def recognize_google(audio_data, *args, **kwargs):
+        return transcript
+    return recognize_google
+
+
+# ---------------------------------------------------------------------------
+# Text to speech
+# ---------------------------------------------------------------------------
+
+class NullTTS:
+    """Replacement for `gtts.gTTS` that produces silent, MP3-sized output offline."""
+
+    # gTTS returns roughly 32 kbit/s MP3 at ~14 characters per second of speech
+    BYTES_PER_CHAR = 300
+    # Simulated synthesis time per character, set by scenarios that model gTTS latency
+    seconds_per_char = 0.0
+
+    def __init__(self, text, lang="en", slow=False, **kwargs):
+        self.text = text
+
+    def _audio_bytes(self):
+        return b"\xff\xf3" + b"\x00" * (len(self.text) * self.BYTES_PER_CHAR)
+
+    def write_to_fp(self, fp):
+        time.sleep(len(self.text) * self.seconds_per_char)
+        fp.write(self._audio_bytes())
+
+    def save(self, savefile):
+        with open(savefile, "wb") as f:
+            self.write_to_fp(f)
+
+
+def use_null_tts(home):
+    """Sends home.py speech through the gTTS backend with NullTTS in place of gTTS."""
+    import tts_backends
+
+    tts_backends.gTTS = NullTTS
+    home.get_tts_backend = tts_backends.GTTSBackend
+
+
+class NullSpeechEngine:
+    """Replacement for a `pyttsx3` engine that records utterances instead of playing them."""
+
+    def __init__(self):
+        self.spoken = []
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def runAndWait(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Streamlit
+# ---------------------------------------------------------------------------
+
+class SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class HeadlessStreamlit(types.ModuleType):
+    """Stand-in for the `streamlit` module that records calls instead of rendering.
+
+    `payload_bytes` counts the bytes every call would have sent to the browser,
+    so scenarios can compare the size of what reaches the websocket.
+    """
+
+    def __init__(self):
+        super().__init__("streamlit")
+        self.session_state = SessionState(authenticated=True, username="benchmark")
+        self.calls = []
+        self.payload_bytes = 0
+
+    def _record(self, name, *args, **kwargs):
+        self.calls.append(name)
+        for value in list(args) + list(kwargs.values()):
+            if isinstance(value, (bytes, bytearray)):
+                self.payload_bytes += len(value)
+            elif isinstance(value, str):
+                self.payload_bytes += len(value.encode("utf-8"))
+        return _NullContext()
+
+    def reset(self):
+        self.calls = []
+        self.payload_bytes = 0
+
+    def _passthrough_cache(self, func=None, **kwargs):
+        if func is None:
+            return lambda f: f
+        return func
+
+    cache_data = _passthrough_cache
+    cache_resource = _passthrough_cache
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._record(name, *args, **kwargs)
+
+
+def load_home(streamlit=None):
+    """Imports home.py against a headless Streamlit and returns (home, streamlit)."""
+    streamlit = streamlit or HeadlessStreamlit()
+    sys.modules["streamlit"] = streamlit
+    sys.modules.pop("home", None)
+
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    os.environ.setdefault("TOGETHER_API_KEY", "benchmark")
+
+    import home
+    return home, streamlit
+
+
+# ---------------------------------------------------------------------------
+# Reminders
+# ---------------------------------------------------------------------------
+
+class RecordingChannel(Channel):
+    """In-process notification channel that records what it is sent, optionally after a delay."""
+
+    def __init__(self, name="recording", latency=0.0):
+        self.name = name
+        self.latency = latency
+        self.sent = []
+
+    def send(self, notification):
+        time.sleep(self.latency)
+        self.sent.append(notification.message)
+
+
+class FakeWebhookServer:
+    """Local HTTP endpoint standing in for a webhook receiver or SMS gateway.
+
+    Every request waits `latency` seconds; every `fail_every`-th request is
+    answered with HTTP 503.
+    """
+
+    def __init__(self, latency=0.0, fail_every=0, host="127.0.0.1", port=0):
+        self.received = []
+        self.requests = 0
+        lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                time.sleep(latency)
+                with lock:
+                    server.requests += 1
+                    failed = fail_every and server.requests % fail_every == 0
+                    if not failed:
+                        server.received.append(body)
+                self.send_response(503 if failed else 200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.httpd.server_port}/notify"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
+
+
+class FakeSMTPServer:
+    """Minimal local SMTP server that keeps every message it is sent, for EmailChannel."""
+
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0):
+        self.messages = []
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode("ascii") + b"\r\n")
+
+            def handle(self):
+                self.reply("220 localhost ready")
+                for line in iter(self.rfile.readline, b""):
+                    command = line.decode("ascii", "replace").strip().upper()
+                    if command.startswith(("EHLO", "HELO")):
+                        self.reply("250 localhost")
+                    elif command == "DATA":
+                        self.reply("354 end with .")
+                        lines = []
+                        for data_line in iter(self.rfile.readline, b""):
+                            if data_line.rstrip(b"\r\n") == b".":
+                                break
+                            lines.append(data_line)
+                        time.sleep(latency)
+                        server.messages.append(b"".join(lines))
+                        self.reply("250 queued")
+                    elif command == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    else:
+                        self.reply("250 ok")
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = host, self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+
+class HeadlessReminderDriver:
+    """Runs the reminder check loop of the Tk apps without Tk, plyer or pyttsx3.
+
+    Like `check_medicine_reminders()`, every tick reloads the prescription
+    files from disk. With a NotificationDispatcher, all doses due for a
+    patient are handed to it as one reminder; without one, the first due
+    medicine is delivered synchronously through `notify` and the speech
+    engine, as the apps did before the dispatcher.
+    """
+
+    def __init__(self, prescription_files, notify=None, speech_engine=None, dispatcher=None):
+        self.prescription_files = list(prescription_files)
+        self.notify = notify or (lambda title, message: None)
+        self.speech_engine = speech_engine or NullSpeechEngine()
+        self.dispatcher = dispatcher
+        self.delivered = 0
+
+    def tick(self, current_time, day=None):
+        for json_file in self.prescription_files:
+            patient_name, schedule = load_prescription(json_file)
+            due = due_medicines(schedule, current_time)
+            if self.dispatcher:
+                if self.dispatcher.notify_due(patient_name, due, current_time, day):
+                    self.delivered += 1
+                continue
+            for medicine, details in due:
+                message = f"Time to take {medicine} - {details['dosage']}"
+                self.notify("Medicine Reminder", message)
+                self.speech_engine.say(f"Hey {patient_name}, it's time to take your {medicine}, {details['dosage']}")
+                self.speech_engine.runAndWait()
+                self.delivered += 1
+                break
+
+    def run_day(self, day="2025-01-01"):
+        """Ticks through every minute of `day` and returns the number of reminders delivered that day."""
+        delivered_before = self.delivered
+        for minute in range(24 * 60):
+            self.tick(f"{minute // 60:02d}:{minute % 60:02d}", day)
+        return self.delivered - delivered_before
+
+
+def fake_image_file(size=64 * 1024):
+    """Returns an in-memory upload the size of a small JPEG."""
+    body = bytes(range(256)) * (size // 256 + 1)
+    image = io.BytesIO(b"\xff\xd8\xff\xe0" + body[:size - 6] + b"\xff\xd9")
+    image.name = "benchmark.jpg"
+    return image
+
+
+def fake_scan_image(index=0, size=2048):
+    """Returns an in-memory upload holding a real grayscale JPEG the size of a scanned slice."""
+    from PIL import Image, ImageChops
+
+    noise = Image.effect_noise((size, size), 40 + index)
+    gradient = Image.linear_gradient("L").resize((size, size)).rotate(index * 15)
+    image = io.BytesIO()
+    ImageChops.add(noise, gradient, scale=2).save(image, "JPEG", quality=90)
+    image.seek(0)
+    image.name = f"slice_{index + 1:02d}.jpg"
+    return image
@@ -0,0 +1,825 @@
+import argparse
+import base64
+import collections
+import concurrent.futures
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import speech_recognition as sr
+
+from benchmarks.fakes import (
+    DEFAULT_RESPONSES,
+    REPO_ROOT,
+    FakeMicrophone,
+    FakeSMTPServer,
+    FakeTogether,
+    FakeTogetherServer,
+    FakeWebhookServer,
+    HeadlessReminderDriver,
+    NullTTS,
+    RecordingChannel,
+    fake_image_file,
+    fake_scan_image,
+    fake_recognize_google,
+    load_home,
+    use_null_tts,
+    write_test_wav,
+)
+from answer_cache import SemanticAnswerCache
+from conversation_history import ConversationHistory
+from medicine_index import DEFAULT_DICTIONARY, MedicineIndex
+from model_router import DEFAULT_ROUTES, ModelRouter
+from notifications import EmailChannel, NotificationDispatcher, SMSChannel, WebhookChannel
+from storage import GroupCommitWriter, atomic_write_json
+from tts_backends import BACKENDS, audio_duration, synthesize_sentences
+
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+DRUG_DICTIONARY = REPO_ROOT / DEFAULT_DICTIONARY
+
+# Scenarios register themselves here: name -> function(args) -> dict of metrics
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def summarize(samples):
+    """Summary statistics in milliseconds for a list of durations in seconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def max_rss_mb():
+    """Peak resident memory of this process in MB, or None where the resource module is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+@scenario("analysis_throughput")
+def analysis_throughput(args):
+    home, _ = load_home()
+    analyzer = home.ImageAnalyzer(medicine_index=MedicineIndex.from_file(DRUG_DICTIONARY))
+    analyzer.client = FakeTogether(latency=args.latency)
+
+    results = {}
+    for kind, analyze in (("prescription", analyzer.analyze_prescription),
+                          ("diagnostic", analyzer.analyze_diagnostic_image)):
+        samples = []
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            result, elapsed = timed(analyze, fake_image_file())
+            assert result, f"{kind} analysis returned nothing"
+            samples.append(elapsed)
+        wall = time.perf_counter() - start
+        results[kind] = dict(summarize(samples), per_second=round(args.iterations / wall, 2))
+    return results
+
+
+@scenario("multi_image_diagnostics")
+def multi_image_diagnostics(args):
+    """One image vs. --images views through analyze_diagnostic_images, and the same views one at a time.
+
+    The process pool is started and warmed before timing, as the app keeps it
+    in st.cache_resource. Use --latency to simulate model time.
+    """
+    home, _ = load_home()
+    uploads = [fake_scan_image(i).getvalue() for i in range(args.images)]
+
+    def files(count):
+        batch = []
+        for i in range(count):
+            upload = io.BytesIO(uploads[i])
+            upload.name = f"slice_{i + 1:02d}.jpg"
+            batch.append(upload)
+        return batch
+
+    pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(4, os.cpu_count() or 1), mp_context=multiprocessing.get_context("spawn"))
+    try:
+        analyzer = home.ImageAnalyzer(image_pool=pool)
+        analyzer.client = FakeTogether(latency=args.latency)
+        assert analyzer.analyze_diagnostic_images(files(1)), "warm-up analysis returned nothing"
+
+        single, single_elapsed = timed(analyzer.analyze_diagnostic_images, files(1))
+        multi, multi_elapsed = timed(analyzer.analyze_diagnostic_images, files(args.images))
+        assert single and multi, "diagnostic analysis returned nothing"
+        sequential, sequential_elapsed = timed(lambda: [analyzer.analyze_diagnostic_image(f) for f in files(args.images)])
+    finally:
+        pool.shutdown()
+
+    return {
+        "images": args.images,
+        "single_seconds": round(single_elapsed, 3),
+        "multi_seconds": round(multi_elapsed, 3),
+        "sequential_seconds": round(sequential_elapsed, 3),
+        "multi_vs_single": round(multi_elapsed / single_elapsed, 2),
+        "per_image": [
+            {"preprocess_ms": round((image["Preprocess_Seconds"] or 0) * 1000, 3),
+             "model_ms": round(image["Model_Seconds"] * 1000, 3)}
+            for image in multi["Images"]
+        ],
+    }
+
+
+@scenario("voice_turn_latency")
+def voice_turn_latency(args):
+    home, st = load_home()
+    use_null_tts(home)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        FakeMicrophone.wav_path = write_test_wav(Path(tmp) / "question.wav")
+        original_microphone = sr.Microphone
+        sr.Microphone = FakeMicrophone
+        try:
+            assistant = home.VoiceAssistant(FakeTogether(latency=args.latency), tmp)
+            assistant.recognizer.recognize_google = fake_recognize_google("when do I take my Paracetamol")
+
+            stages = {"listen": [], "transcribe": [], "process_query": [], "speak": [], "turn": []}
+            for _ in range(args.iterations):
+                turn_start = time.perf_counter()
+                audio, elapsed = timed(assistant.listen)
+                stages["listen"].append(elapsed)
+                text, elapsed = timed(assistant.transcribe, audio)
+                stages["transcribe"].append(elapsed)
+                response, elapsed = timed(assistant.process_query, text)
+                stages["process_query"].append(elapsed)
+                st.reset()
+                _, elapsed = timed(assistant.speak, response["concise"])
+                stages["speak"].append(elapsed)
+                stages["turn"].append(time.perf_counter() - turn_start)
+        finally:
+            sr.Microphone = original_microphone
+
+    results = {stage: summarize(samples) for stage, samples in stages.items()}
+    results["speak_payload_bytes"] = st.payload_bytes
+    return results
+
+
+LONG_REPLY = (
+    "Meningioma is a usually benign tumour that grows from the membranes around the brain and spinal cord. "
+    "Many are small and found by chance, and some only need regular scans. "
+    "Larger ones can press on the brain and cause headaches, seizures or vision changes. "
+    "Treatment options include surgery and radiotherapy, depending on size and location. "
+    "Your neurologist will explain which option suits you best."
+)
+
+
+def legacy_speak(st, text):
+    """The pre-st.audio delivery path: one base64 data URI injected as HTML."""
+    buffer = io.BytesIO()
+    NullTTS(text).write_to_fp(buffer)
+    audio_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    st.markdown(f"""
+                <audio autoplay>
+                    <source src="data:audio/mp3;base64,{audio_base64}" type="audio/mp3">
+                    Your browser does not support the audio element.
+                </audio>
+                """, unsafe_allow_html=True)
+
+
+@scenario("speech_delivery")
+def speech_delivery(args):
+    home, st = load_home()
+    use_null_tts(home)
+    NullTTS.seconds_per_char = args.tts_latency_per_char
+
+    # Time-to-play is the time until the first clip reaches the page
+    first_play = {}
+    original_record = st._record
+
+    def record(name, *a, **kw):
+        if name in ("audio", "markdown") and "at" not in first_play:
+            first_play["at"] = time.perf_counter()
+        return original_record(name, *a, **kw)
+
+    st._record = record
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            assistant = home.VoiceAssistant(FakeTogether(), tmp)
+        for label, text in (("short", DEFAULT_RESPONSES["summary"]), ("long", LONG_REPLY)):
+            for path, speak in (("legacy_html", lambda t: legacy_speak(st, t)),
+                                ("st_audio", assistant.speak)):
+                st.reset()
+                first_play.clear()
+                start = time.perf_counter()
+                speak(text)
+                results[f"{label}.{path}"] = {
+                    "browser_bytes": st.payload_bytes,
+                    "time_to_play_ms": round((first_play["at"] - start) * 1000, 3),
+                }
+    finally:
+        st._record = original_record
+        NullTTS.seconds_per_char = 0.0
+    return results
+
+
+@scenario("conversation_history")
+def conversation_history(args):
+    home, st = load_home()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for turns in (100, 1000, 10000):
+            history = ConversationHistory(os.path.join(tmp, str(turns)))
+            tracemalloc.start()
+            start = time.perf_counter()
+            for _ in range(turns):
+                history.append("user", DEFAULT_RESPONSES["chat"])
+            append_elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            # Rerun cost: what the Voice Assistant page renders on every rerun
+            render_samples = []
+            for _ in range(args.iterations):
+                st.reset()
+                _, elapsed = timed(home.render_conversation_page, history, 1)
+                render_samples.append(elapsed)
+            _, oldest_page = timed(history.page, history.page_count())
+
+            results[f"{turns}_turns"] = {
+                "append_mean_ms": round(append_elapsed / turns * 1000, 4),
+                "append_peak_kb": round(peak / 1024, 1),
+                "render_page": summarize(render_samples),
+                "render_payload_bytes": st.payload_bytes,
+                "oldest_page_ms": round(oldest_page * 1000, 3),
+            }
+    return results
+
+
+# Paraphrased patient questions; each group should share one cached answer
+QUESTION_GROUPS = [
+    ["When do I take my Paracetamol?", "When should I take Paracetamol", "when do i take my paracetamol"],
+    ["What is meningioma?", "What's a meningioma", "Tell me about meningioma"],
+    ["When do I take my Augmentin?", "When should I take Augmentin?"],
+    ["What are the side effects of Enzoflam?", "What are the side effects of enzoflam"],
+]
+
+
+@scenario("answer_cache")
+def answer_cache(args):
+    home, _ = load_home()
+    contexts = [None, {"Patient": {"Name": "Patient A"}}, {"Patient": {"Name": "Patient B"}}]
+    workload = [(q, contexts[i % len(contexts)])
+                for i in range(args.iterations) for q in QUESTION_GROUPS[i % len(QUESTION_GROUPS)]]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, cache in (("uncached", None), ("cached", SemanticAnswerCache())):
+            client = FakeTogether(latency=args.latency)
+            assistant = home.VoiceAssistant(client, tmp, cache)
+            samples = []
+            for query, context in workload:
+                _, elapsed = timed(assistant.process_query, query, context)
+                samples.append(elapsed)
+            results[label] = dict(summarize(samples), llm_calls=len(client.calls))
+            if cache:
+                results[label]["cache"] = cache.stats()
+
+        # Lookup cost against a full cache
+        cache = SemanticAnswerCache(max_entries=1000)
+        for i in range(1000):
+            cache.put(f"what is condition number {i}", {"full": "x", "concise": "x"})
+        lookups = [timed(cache.get, f"tell me about condition number {i}")[1] for i in range(args.iterations)]
+        results["lookup_1000_entries"] = summarize(lookups)
+
+        # Answers never cross users, and follow-ups that depend on the conversation are never cached
+        isolation = SemanticAnswerCache()
+        isolation.put("what is meningioma", {"full": "x", "concise": "x"}, scope="alice")
+        isolation.put("what should I do", {"full": "x", "concise": "x"}, scope="alice")
+        assert isolation.get("what is meningioma", scope="bob") is None, "answer leaked across users"
+        assert isolation.get("what should I do", scope="alice") is None, "follow-up answered from cache"
+        assert isolation.get("what is meningioma", scope="alice"), "same-user repeat missed"
+
+        # A different question word is a different question, while do/should are the same one
+        questions = SemanticAnswerCache()
+        questions.put("When do I take my Paracetamol?", {"full": "x", "concise": "x"})
+        questions.put("What is meningioma?", {"full": "x", "concise": "x"})
+        for other in ("Can I take paracetamol", "Why do I take my paracetamol", "Should I take Paracetamol?",
+                      "How do I take paracetamol", "Who is meningioma", "Why meningioma"):
+            assert questions.get(other) is None, f"{other!r} answered from a different question"
+        assert questions.get("When should I take my paracetamol"), "do/should paraphrase missed"
+    return results
+
+
+@scenario("model_routing")
+def model_routing(args):
+    """Text-only turns against a slow, flaky primary chat model, with and without failover.
+
+    Requests go through the app's own Together client to a local FakeTogetherServer
+    (via TOGETHER_BASE_URL), so any retrying inside the SDK shows up in the timings
+    and in the per-model call counts.
+    """
+    home, _ = load_home()
+    chat_primary, chat_fallback = DEFAULT_ROUTES["chat"][:2]
+    summary_primary = DEFAULT_ROUTES["summarization"][0]
+    model_latency = {
+        chat_primary: args.latency + 0.05,
+        chat_fallback: args.latency + 0.005,
+        summary_primary: args.latency + 0.002,
+    }
+    routers = {
+        "single_model": ModelRouter(routes={"chat": [chat_primary], "summarization": [summary_primary]}),
+        "router": ModelRouter(latency_thresholds={"chat": 0.03}, cooldown=1.0),
+    }
+
+    results = {}
+    original_base_url = os.environ.get("TOGETHER_BASE_URL")
+    try:
+        for label, router in routers.items():
+            fake = FakeTogether(model_latency=model_latency, model_failure_rate={chat_primary: 0.2})
+            with FakeTogetherServer(fake) as server:
+                os.environ["TOGETHER_BASE_URL"] = server.base_url
+                client = home.ImageAnalyzer(router=router).client
+                samples, errors = [], 0
+                for i in range(args.iterations):
+                    start = time.perf_counter()
+                    try:
+                        router.complete(client, "chat", [{"role": "user", "content": f"question {i}"}])
+                        router.complete(client, "summarization", [{"role": "system", "content": "You are a summarizer"}])
+                    except Exception:
+                        errors += 1
+                    samples.append(time.perf_counter() - start)
+            calls = collections.Counter(call["model"] for call in fake.calls)
+            results[label] = dict(summarize(samples), errors=errors, calls=dict(calls), models=router.snapshot())
+    finally:
+        if original_base_url is None:
+            os.environ.pop("TOGETHER_BASE_URL", None)
+        else:
+            os.environ["TOGETHER_BASE_URL"] = original_base_url
+    return results
+
+
+@scenario("tts_backends")
+def tts_backends_scenario(args):
+    """Synthesis time and real-time factor (synthesis time / audio length) per TTS engine."""
+    results = {}
+    for name, backend_class in BACKENDS.items():
+        if name == "gtts" and not args.tts_network:
+            results[name] = {"skipped": "needs network, pass --tts-network"}
+            continue
+        try:
+            backend = backend_class()
+        except Exception as e:
+            results[name] = {"skipped": str(e)}
+            continue
+
+        for label, text in (("short", DEFAULT_RESPONSES["summary"]), ("long", LONG_REPLY)):
+            (audio, mime_type), sequential = timed(backend.synthesize, text)
+            (_, _), parallel = timed(synthesize_sentences, backend, text)
+            seconds = audio_duration(audio, mime_type)
+            results[f"{name}.{label}"] = {
+                "audio_seconds": round(seconds, 2),
+                "sequential_ms": round(sequential * 1000, 1),
+                "parallel_ms": round(parallel * 1000, 1),
+                "rtf": round(sequential / seconds, 3) if seconds else None,
+                "parallel_rtf": round(parallel / seconds, 3) if seconds else None,
+            }
+    return results
+
+
+def synthetic_drug_names(count, seed=0):
+    """Pronounceable made-up drug names, so the index has realistic trigram statistics."""
+    rng = random.Random(seed)
+    syllables = ["ab", "ac", "al", "am", "an", "ar", "ce", "ci", "co", "da", "de", "di", "do", "fen", "flo",
+                 "ga", "lin", "lo", "ma", "mi", "mox", "na", "ne", "ol", "pa", "pra", "ro", "sar", "ta", "te",
+                 "ti", "tol", "tra", "va", "vir", "xa", "zi", "zol", "zam", "zine"]
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(syllables) for _ in range(rng.randint(3, 5))).capitalize())
+    return sorted(names)
+
+
+def ocr_noise(name, rng):
+    """One substituted character, the typical vision-OCR error."""
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice("aeiouln") + name[i + 1:]
+
+
+@scenario("medicine_index")
+def medicine_index(args):
+    with open(DRUG_DICTIONARY, "r", encoding="utf-8") as f:
+        dictionary = [line.strip() for line in f if line.strip()]
+    names = synthetic_drug_names(args.drug_names) + dictionary
+
+    index, build_elapsed = timed(MedicineIndex, names)
+    rng = random.Random(1)
+    queries = [ocr_noise(rng.choice(names), rng) for _ in range(args.iterations)]
+
+    uncached = [timed(index._lookup, query)[1] for query in queries]
+    for query in queries:
+        index.resolve(query)
+    cached = [timed(index.resolve, query)[1] for query in queries]
+
+    suggested, _ = index.resolve("Tr Billedonna")
+    return {
+        "entries": len(index),
+        "build_seconds": round(build_elapsed, 3),
+        "lookup_uncached": summarize(uncached),
+        "lookup_cached": summarize(cached),
+        "tr_billedonna_suggests": suggested,
+    }
+
+
+def write_synthetic_archive(data_dir, files, start=0):
+    """Writes `files` small records into a data/-style tree: 60% prescriptions, 30% diagnostics, 10% voice."""
+    prescription = json.loads(DEFAULT_RESPONSES["prescription"])
+    diagnostic = json.loads(DEFAULT_RESPONSES["diagnostic"])
+    conversation = [{"role": "user", "content": "what is meningioma"},
+                    {"role": "assistant", "content": DEFAULT_RESPONSES["chat"]}]
+    for kind in ("prescriptions", "diagnostics", "voice_conversations"):
+        os.makedirs(os.path.join(data_dir, kind), exist_ok=True)
+
+    base = datetime.datetime(2025, 1, 1)
+    for i in range(start, start + files):
+        stamp = (base + datetime.timedelta(minutes=i)).strftime("%Y%m%d_%H%M%S")
+        bucket = i % 10
+        if bucket < 6:
+            path, record = os.path.join(data_dir, "prescriptions", f"prescription_{stamp}_{i}.json"), prescription
+        elif bucket < 9:
+            path, record = os.path.join(data_dir, "diagnostics", f"diagnostic_{stamp}_{i}.json"), diagnostic
+        else:
+            path, record = os.path.join(data_dir, "voice_conversations", f"voice_conversation_{stamp}_{i}.json"), conversation
+        with open(path, "w") as f:
+            json.dump(record, f)
+
+
+@scenario("archive_export")
+def archive_export_scenario(args):
+    try:
+        import archive_export
+    except ImportError as e:
+        return {"skipped": str(e)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, export_dir = os.path.join(tmp, "data"), os.path.join(tmp, "exports")
+        _, generate = timed(write_synthetic_archive, data_dir, args.archive_files)
+
+        rss_before = max_rss_mb()
+        full = archive_export.export_archive(data_dir, export_dir, full=True)
+        rss_after = max_rss_mb()
+
+        # Incremental run: 1% new files on top of the exported archive
+        time.sleep(0.01)
+        new_files = max(1, args.archive_files // 100)
+        write_synthetic_archive(data_dir, new_files, start=args.archive_files)
+        incremental = archive_export.export_archive(data_dir, export_dir)
+
+        df, read_elapsed = timed(archive_export.read_export, "prescriptions", export_dir)
+
+    return {
+        "files": args.archive_files,
+        "generate_seconds": round(generate, 2),
+        "full": {
+            "seconds": full["seconds"],
+            "files_per_second": round(full["files"] / full["seconds"]) if full["seconds"] else None,
+            "rows": full["rows"],
+            "max_rss_growth_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+        },
+        "incremental": {"files": incremental["files"], "rows": incremental["rows"], "seconds": incremental["seconds"]},
+        "read_prescriptions": {"rows": len(df), "seconds": round(read_elapsed, 3)},
+    }
+
+
+def write_synthetic_prescriptions(directory, patients, medicines_per_patient=3):
+    """Writes one prescription per patient with doses spread over the day."""
+    files = []
+    for p in range(patients):
+        medicines = []
+        for m in range(medicines_per_patient):
+            minute = (p * 7 + m * 131) % (24 * 60)
+            medicines.append({
+                "Type": "Tablet",
+                "Medicine": f"Medicine {m}",
+                "Dosage": "500mg",
+                "Timings": [f"{minute // 60:02d}:{minute % 60:02d}",
+                            f"{(minute + 480) % 1440 // 60:02d}:{(minute + 480) % 60:02d}"],
+            })
+        path = Path(directory) / f"prescription_{p:06d}.json"
+        with open(path, "w") as f:
+            json.dump({"Date": "", "Patient": {"Name": f"Patient {p}", "Age": "50"}, "Medicines": medicines}, f)
+        files.append(path)
+    return files
+
+
+@scenario("reminder_dispatch")
+def reminder_dispatch(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_synthetic_prescriptions(tmp, args.patients)
+        driver = HeadlessReminderDriver(files)
+        delivered, elapsed = timed(driver.run_day)
+
+    ticks = 24 * 60
+    return {
+        "patients": args.patients,
+        "delivered": delivered,
+        "day_seconds": round(elapsed, 3),
+        "tick_mean_ms": round(elapsed / ticks * 1000, 3),
+    }
+
+
+@scenario("notification_dispatch")
+def notification_dispatch(args):
+    """Two simulated days through the dispatcher with a slow webhook, a flaky SMS gateway and local SMTP.
+
+    The synchronous baseline delivers the same reminders inline through a
+    notifier as slow as the webhook, the way the Tk apps used to.
+    """
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeWebhookServer(latency=args.slow_channel_latency) as webhook, \
+            FakeWebhookServer(fail_every=3) as sms_gateway, \
+            FakeSMTPServer() as smtp:
+        files = write_synthetic_prescriptions(tmp, args.patients)
+        dispatcher = NotificationDispatcher([
+            RecordingChannel("desktop"),
+            WebhookChannel(webhook.url),
+            SMSChannel(sms_gateway.url, "+15550100"),
+            EmailChannel(smtp.host, smtp.port, "mediclock@localhost", "caregiver@localhost"),
+        ], base_delay=0.01, max_delay=0.2).start()
+
+        driver = HeadlessReminderDriver(files, dispatcher=dispatcher)
+        reminders, day_elapsed = timed(driver.run_day, "2025-01-01")
+        # The apps run for days; the same schedule has to fire again on the next one
+        second_day = driver.run_day("2025-01-02")
+        assert second_day == reminders, f"{second_day} reminders on day two, expected {reminders}"
+
+        drain_start = time.perf_counter()
+        deadline = drain_start + 300
+        while time.perf_counter() < deadline:
+            channels = dispatcher.stats()
+            if all(c["delivered"] + c["failed"] == reminders + second_day for c in channels.values()):
+                break
+            time.sleep(0.05)
+        drain_elapsed = time.perf_counter() - drain_start
+        dispatcher.stop()
+
+        blocking = HeadlessReminderDriver(files, notify=lambda title, message: time.sleep(args.slow_channel_latency))
+        blocking_delivered, blocking_elapsed = timed(blocking.run_day)
+
+    ticks = 24 * 60
+    return {
+        "patients": args.patients,
+        "reminders": reminders,
+        "second_day_reminders": second_day,
+        "day_seconds": round(day_elapsed, 3),
+        "tick_mean_ms": round(day_elapsed / ticks * 1000, 3),
+        "drain_seconds": round(drain_elapsed, 3),
+        "channels": channels,
+        "blocking_baseline": {
+            "delivered": blocking_delivered,
+            "day_seconds": round(blocking_elapsed, 3),
+            "tick_mean_ms": round(blocking_elapsed / ticks * 1000, 3),
+        },
+    }
+
+
+def write_concurrently(write, records, threads):
+    """Saves `records` numbered records through write(index) from `threads` threads; returns records per second."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        _, elapsed = timed(lambda: list(pool.map(write, range(records))))
+    return round(records / elapsed, 1)
+
+
+def crash_trial(mode, directory, rng):
+    """Runs benchmarks.crash_writer, kills it at a random moment and returns the acknowledged writes."""
+    child = subprocess.Popen([sys.executable, "-m", "benchmarks.crash_writer", mode, directory],
+                             cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+    assert child.stdout.readline().strip() == "ready"
+    time.sleep(rng.uniform(0.05, 0.5))
+    child.kill()
+    output, _ = child.communicate()
+    return [line.split(" ", 1)[1] for line in output.splitlines() if line.startswith("ack ")]
+
+
+def readable_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@scenario("durable_writes")
+def durable_writes(args):
+    """Write throughput of in-place, atomic and group-committed saves, then SIGKILL crash injection.
+
+    Killing the writer leaves the page cache intact, so the crash trials check
+    for torn files and lost acknowledged records, not for power-loss behaviour.
+    """
+    record = json.loads(DEFAULT_RESPONSES["diagnostic"])
+    throughput = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        def in_place(i):
+            with open(os.path.join(tmp, f"plain_{i}.json"), "w") as f:
+                json.dump(record, f, indent=4)
+
+        throughput["in_place"] = write_concurrently(in_place, args.records, args.writer_threads)
+        throughput["atomic"] = write_concurrently(
+            lambda i: atomic_write_json(os.path.join(tmp, f"atomic_{i}.json"), record, indent=4),
+            args.records, args.writer_threads)
+
+        writer = GroupCommitWriter(os.path.join(tmp, ".journal.jsonl"))
+        throughput["group_commit"] = write_concurrently(
+            lambda i: writer.write(os.path.join(tmp, f"group_{i}.json"), record, indent=4),
+            args.records, args.writer_threads)
+        writer.close()
+        # atomic_write_json fsyncs the file and its directory; group commit fsyncs the journal once per batch
+        fsyncs = {"in_place": 0, "atomic": 2, "group_commit": round(writer.batches / max(1, writer.records), 3)}
+
+    rng = random.Random(42)
+    crashes = {}
+    for mode in ("plain", "atomic"):
+        torn = 0
+        for _ in range(args.crash_trials):
+            with tempfile.TemporaryDirectory() as tmp:
+                acked = crash_trial(mode, tmp, rng)
+                users = readable_json(os.path.join(tmp, "users.json"))
+                # A clean file holds the last acknowledged save or the one in flight
+                if acked and (users is None or int(users["last"]) < int(acked[-1])):
+                    torn += 1
+        crashes[mode] = {"trials": args.crash_trials, "torn_or_lost": torn}
+
+    lost = corrupt = recovered = acked_total = 0
+    for _ in range(args.crash_trials):
+        with tempfile.TemporaryDirectory() as tmp:
+            acked = crash_trial("group", tmp, rng)
+            recovered += GroupCommitWriter(os.path.join(tmp, ".journal.jsonl")).recover()
+            acked_total += len(acked)
+            lost += sum(1 for name in acked if readable_json(os.path.join(tmp, name)) is None)
+            corrupt += sum(1 for name in os.listdir(tmp)
+                           if name.endswith(".json") and readable_json(os.path.join(tmp, name)) is None)
+    crashes["group"] = {"trials": args.crash_trials, "acknowledged": acked_total, "lost": lost,
+                        "corrupt_files": corrupt, "recovered_from_journal": recovered}
+
+    return {"records": args.records, "threads": args.writer_threads,
+            "records_per_second": throughput, "fsyncs_per_record": fsyncs, "crash_injection": crashes}
+
+
+@scenario("login_load")
+def login_load(args):
+    home, _ = load_home()
+    with tempfile.TemporaryDirectory() as tmp:
+        home.USER_FILE = os.path.join(tmp, "users.json")
+        home.save_users({f"user{i}": f"password{i}" for i in range(args.users)})
+
+        auth_samples = []
+        for i in range(args.iterations):
+            ok, elapsed = timed(home.authenticate_user, f"user{i % args.users}", f"password{i % args.users}")
+            assert ok
+            auth_samples.append(elapsed)
+
+        register_samples = []
+        for i in range(args.iterations):
+            ok, elapsed = timed(home.register_user, f"new{i}", "secret")
+            assert ok
+            register_samples.append(elapsed)
+
+    return {"users": args.users, "authenticate": summarize(auth_samples), "register": summarize(register_samples)}
+
+
+# ---------------------------------------------------------------------------
+# Recording and comparison
+# ---------------------------------------------------------------------------
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(metrics, prefix=""):
+    flat = {}
+    for key, value in metrics.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(previous, current, threshold):
+    """Prints timing metrics that moved by more than `threshold` (a fraction)."""
+    old, new = flatten(previous["scenarios"]), flatten(current["scenarios"])
+    regressions = 0
+    for name in sorted(new):
+        if name not in old or not old[name] or not name.endswith("_ms"):
+            continue
+        change = (new[name] - old[name]) / old[name]
+        if abs(change) >= threshold:
+            label = "REGRESSION" if change > 0 else "improvement"
+            regressions += change > 0
+            print(f"  {label:11} {name}: {old[name]} -> {new[name]} ({change:+.0%})")
+    return regressions
+
+
+def latest_result(directory, parameters):
+    """The newest saved run made with the same parameters, or None."""
+    for path in sorted(Path(directory).glob("*.json"), reverse=True):
+        try:
+            with open(path, "r") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if result.get("parameters") == parameters:
+            return result
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline Mediclock benchmarks.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all). Choices: {', '.join(SCENARIOS)}")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--tts-latency-per-char", type=float, default=0.0005,
+                        help="Simulated gTTS synthesis time per character in seconds")
+    parser.add_argument("--tts-network", action="store_true", help="Include gTTS in the tts_backends scenario")
+    parser.add_argument("--images", type=int, default=8, help="Views per case in multi_image_diagnostics")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--slow-channel-latency", type=float, default=0.01,
+                        help="Seconds per request for the slow webhook in notification_dispatch")
+    parser.add_argument("--drug-names", type=int, default=100000, help="Synthetic dictionary size for medicine_index")
+    parser.add_argument("--archive-files", type=int, default=20000,
+                        help="Synthetic corpus size for archive_export (e.g. 1000000)")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--records", type=int, default=2000, help="Records saved per mode in durable_writes")
+    parser.add_argument("--writer-threads", type=int, default=8)
+    parser.add_argument("--crash-trials", type=int, default=10)
+    parser.add_argument("--output-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change reported by the comparison")
+    args = parser.parse_args()
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    parameters = {k: v for k, v in vars(args).items() if k not in ("scenarios", "output_dir")}
+    previous = latest_result(args.output_dir, parameters) if os.path.isdir(args.output_dir) else None
+
+    run = {
+        "commit": current_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "parameters": parameters,
+        "scenarios": {},
+    }
+    for name in names:
+        print(f"Running {name}...")
+        run["scenarios"][name] = SCENARIOS[name](args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = os.path.join(args.output_dir, f"benchmark_{timestamp}_{run['commit']}.json")
+    with open(output_path, "w") as f:
+        json.dump(run, f, indent=4)
+    print(f"Results saved to {output_path}")
+
+    if previous:
+        print(f"Compared with {previous['commit']} ({previous['timestamp']}):")
+        if compare(previous, run, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import re
+
+# Parsing of the Confidence_Score field of diagnostic results. It has no
+# third-party imports, so the Parquet export can use it without Pillow.
+
+def parse_confidence(value):
+    """Confidence as a number from 0 to 100, from values like 80, "80", "80%" or "High (85%)"."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r"\d+(\.\d+)?", str(value))
+    return float(match.group(0)) if match else None
@@ -0,0 +1,83 @@
+import collections
+import datetime
+import itertools
+import json
+import os
+
+from storage import create_unique_file
+
+class ConversationHistory:
+    """Voice assistant conversation that is appended to a per-session JSONL file turn by turn.
+
+    Only the last `window` turns stay in memory. Older pages are read back from
+    the file, using the byte offset recorded at the start of every page, so
+    memory and rerun cost stay flat however long the session runs.
+    """
+
+    def __init__(self, directory, window=50, page_size=10):
+        self.directory = directory
+        self.window = window
+        self.page_size = page_size
+        self.start_session()
+
+    def start_session(self):
+        """Starts a new session; its file is created with the first turn and earlier sessions stay on disk."""
+        self.started = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filepath = None
+        self.recent_turns = collections.deque(maxlen=self.window)
+        self.count = 0
+        self.page_offsets = []
+
+    def reset(self):
+        self.start_session()
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def append(self, role, content):
+        turn = {"role": role, "content": content, "timestamp": datetime.datetime.now().isoformat(timespec="seconds")}
+        line = (json.dumps(turn) + "\n").encode("utf-8")
+
+        if self.filepath is None:
+            # Sessions started in the same second (or a quick reset) each get a file of their own
+            self.filepath = create_unique_file(self.directory, f"voice_conversation_{self.started}", ".jsonl")
+        with open(self.filepath, "ab") as f:
+            if self.count % self.page_size == 0:
+                self.page_offsets.append(f.seek(0, os.SEEK_END))
+            f.write(line)
+
+        self.recent_turns.append(turn)
+        self.count += 1
+        return turn
+
+    def recent(self, n):
+        """Returns the last n turns, oldest first."""
+        if n <= 0:
+            return []
+        return list(self.recent_turns)[-n:]
+
+    def page_count(self):
+        return max(1, -(-self.count // self.page_size))
+
+    def page(self, page_number):
+        """Returns the turns on a page, oldest first. Page 1 is the most recent."""
+        end = self.count - (page_number - 1) * self.page_size
+        start = max(0, end - self.page_size)
+        if end <= 0:
+            return []
+        return self._turns(start, end)
+
+    def _turns(self, start, end):
+        in_memory_from = self.count - len(self.recent_turns)
+        if start >= in_memory_from:
+            return list(itertools.islice(self.recent_turns, start - in_memory_from, end - in_memory_from))
+
+        # Older than the in-memory window: seek to the page holding `start` and read forward
+        first_line = (start // self.page_size) * self.page_size
+        with open(self.filepath, "rb") as f:
+            f.seek(self.page_offsets[start // self.page_size])
+            lines = itertools.islice(f, start - first_line, end - first_line)
+            return [json.loads(line) for line in lines]
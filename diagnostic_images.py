@@ -0,0 +1,121 @@
+import base64
+import io
+import time
+
+from PIL import Image, ImageOps
+
+from confidence import parse_confidence
+
+# Helpers for analyzing several views of one case (e.g. MRI slices) together.
+# This module is kept free of Streamlit so process-pool workers can import it
+# without running the app.
+
+# Vision models downscale large images anyway; sending them smaller saves upload time
+MAX_IMAGE_SIDE = 1024
+JPEG_QUALITY = 85
+
+def to_8bit(image):
+    """Stretches a 16-bit or float grayscale image (common for MRI/CT exports) to 8-bit.
+
+    A plain convert() clips every value above 255, so the image's own
+    min/max range is mapped onto 0-255 instead.
+    """
+    image = image.convert("F" if image.mode == "F" else "I")
+    low, high = image.getextrema()
+    scale = 255.0 / (high - low) if high > low else 0.0
+    return image.point(lambda value: value * scale - low * scale).convert("L")
+
+def preprocess_image(data, max_side=MAX_IMAGE_SIDE, quality=JPEG_QUALITY):
+    """Decodes an uploaded image, fits it within max_side and re-encodes it as JPEG.
+
+    Returns (base64_jpeg, info) where info holds the output size and the
+    seconds spent.
+    """
+    start = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode.startswith("I") or image.mode == "F":
+            image = to_8bit(image)
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8"), {
+        "width": image.width,
+        "height": image.height,
+        "bytes": buffer.tell(),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def _preprocess_or_error(data):
+    try:
+        return preprocess_image(data)
+    except Exception as e:
+        return None, {"error": str(e)}
+
+def preprocess_in_pool(data, pool=None):
+    """Pre-processes one image in a process pool (or in this process without one).
+
+    Returns (base64_jpeg, info), or (None, {"error": ...}) if the image could
+    not be decoded.
+    """
+    if pool is None:
+        return _preprocess_or_error(data)
+    return pool.submit(_preprocess_or_error, data).result()
+
+def _union(results, key):
+    """Items of a list field across results, without duplicates (case-insensitive), in first-seen order."""
+    seen = {}
+    for result in results:
+        items = result.get(key) or []
+        for item in [items] if isinstance(items, str) else items:
+            seen.setdefault(str(item).strip().lower(), str(item).strip())
+    return [item for item in seen.values() if item]
+
+def merge_diagnostics(per_image):
+    """Combines per-image diagnostic results into one.
+
+    The predicted disease is the one with the highest total confidence across
+    images; its confidence is the mean over the images that agree with it.
+    Causes and actions are the union over all images, and each image's own
+    prediction is kept under "Images".
+    """
+    analyzed = [entry for entry in per_image if entry.get("Result")]
+    if not analyzed:
+        return None
+
+    votes = {}
+    for entry in analyzed:
+        result = entry["Result"]
+        disease = str(result.get("Predicted_Disease", "Unknown")).strip()
+        confidence = parse_confidence(result.get("Confidence_Score"))
+        vote = votes.setdefault(disease.lower(), {"name": disease, "weight": 0.0, "entries": []})
+        # Images without a usable score count as a coin flip
+        vote["weight"] += 50.0 if confidence is None else confidence
+        vote["entries"].append((confidence, result))
+
+    winner = max(votes.values(), key=lambda vote: vote["weight"])
+    scores = [confidence for confidence, _ in winner["entries"] if confidence is not None]
+    best = max(winner["entries"], key=lambda item: item[0] or 0)[1]
+
+    return {
+        "Predicted_Disease": winner["name"],
+        "Confidence_Score": f"{sum(scores) / len(scores):.0f}%" if scores else "N/A",
+        "Description": best.get("Description", ""),
+        "Possible_Causes": _union([entry["Result"] for entry in analyzed], "Possible_Causes"),
+        "Recommended_Actions": _union([entry["Result"] for entry in analyzed], "Recommended_Actions"),
+        "Agreement": f"{len(winner['entries'])} of {len(analyzed)} images",
+        "Images": [
+            {
+                "Image": entry["Image"],
+                "Predicted_Disease": (entry.get("Result") or {}).get("Predicted_Disease"),
+                "Confidence_Score": (entry.get("Result") or {}).get("Confidence_Score"),
+                "Description": (entry.get("Result") or {}).get("Description"),
+                "Error": entry.get("Error"),
+                "Preprocess_Seconds": entry.get("Preprocess_Seconds"),
+                "Model_Seconds": entry.get("Model_Seconds"),
+            }
+            for entry in per_image
+        ],
+    }
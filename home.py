@@ -8,12 +8,20 @@ from together import Together
 from dotenv import load_dotenv
 import os
 import datetime
+import uuid
 import speech_recognition as sr
-from gtts import gTTS
-import tempfile
+from pydub import AudioSegment
 import io
-import threading
 import time
+import concurrent.futures
+import multiprocessing
+from conversation_history import ConversationHistory
+from answer_cache import SemanticAnswerCache
+from model_router import ModelRouter
+from medicine_index import MedicineIndex, normalize_medicines
+from diagnostic_images import preprocess_in_pool, merge_diagnostics
+from storage import GroupCommitWriter, atomic_write_json, file_lock, unique_path
+from tts_backends import load_backend, synthesize_sentences
 
 # Load environment variables
 load_dotenv()
@@ -28,19 +36,20 @@ def load_users():
         return json.load(f)
 
 def save_users(users):
-    with open(USER_FILE, "w") as f:
-        json.dump(users, f)
+    atomic_write_json(USER_FILE, users)
 
 def authenticate_user(username, password):
     users = load_users()
     return users.get(username) == password
 
 def register_user(username, password):
-    users = load_users()
-    if username in users:
-        return False  # User already exists
-    users[username] = password
-    save_users(users)
+    # Hold the lock across the read and the write so concurrent registrations don't drop each other
+    with file_lock(USER_FILE):
+        users = load_users()
+        if username in users:
+            return False  # User already exists
+        users[username] = password
+        save_users(users)
     return True
 
 def login_page():
@@ -92,20 +101,89 @@ def create_storage_directories():
 # Save JSON data to file
 def save_json_data(data, directory, file_prefix):
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{file_prefix}_{timestamp}.json"
-    filepath = os.path.join(directory, filename)
+    filepath = unique_path(directory, f"{file_prefix}_{timestamp}")
     
-    with open(filepath, 'w') as f:
-        json.dump(data, indent=4, fp=f)
+    writer = get_record_writer()
+    if writer:
+        writer.write(filepath, data, indent=4)
+    else:
+        atomic_write_json(filepath, data, indent=4)
     
     return filepath
 
+# With MEDICLOCK_GROUP_COMMIT=1, records saved around the same time (e.g. by
+# several sessions during bulk ingestion) share one fsync of a journal.
+# Records from a crashed run are restored from the journal on startup.
+@st.cache_resource
+def get_record_writer():
+    if os.getenv("MEDICLOCK_GROUP_COMMIT", "0") != "1":
+        return None
+    os.makedirs("data", exist_ok=True)
+    writer = GroupCommitWriter(os.path.join("data", ".journal.jsonl"))
+    writer.recover()
+    return writer
+
+SPEECH_BITRATE = "24k"
+
+# Re-encode speech as low-bitrate Opus when ffmpeg is available, otherwise keep the original clip
+def compress_audio(audio_bytes, mime_type, bitrate=SPEECH_BITRATE):
+    try:
+        segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format=mime_type.split("/")[1]).set_channels(1)
+        opus_buffer = io.BytesIO()
+        segment.export(opus_buffer, format="ogg", codec="libopus", bitrate=bitrate)
+        opus_bytes = opus_buffer.getvalue()
+        if opus_bytes and len(opus_bytes) < len(audio_bytes):
+            return opus_bytes, "audio/ogg"
+    except Exception:
+        pass
+    return audio_bytes, mime_type
+
+# The TTS engine (and any voice model it loads) is kept across reruns and sessions
+@st.cache_resource
+def get_tts_backend():
+    return load_backend()
+
+# Synthesized clips are cached, so repeated replies are served from Streamlit's
+# media endpoint without synthesizing them again
+@st.cache_data(show_spinner=False, max_entries=256)
+def synthesize_speech(text):
+    audio_bytes, mime_type = synthesize_sentences(get_tts_backend(), text)
+    return compress_audio(audio_bytes, mime_type)
+
+# One model router shared by all sessions, so latency and error stats cover every request
+@st.cache_resource
+def get_model_router():
+    return ModelRouter()
+
+# Drug dictionary index used to clean up medicine names from prescription OCR
+@st.cache_resource
+def get_medicine_index():
+    return MedicineIndex.from_file()
+
+# One answer cache shared by all sessions; answers are partitioned by analysis context
+@st.cache_resource
+def get_answer_cache():
+    return SemanticAnswerCache()
+
+# Worker processes for decoding and resizing diagnostic images. They are spawned
+# rather than forked, since the Streamlit server process runs many threads.
+@st.cache_resource
+def get_image_pool():
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(4, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
 # Voice Assistant Class
 class VoiceAssistant:
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, history_dir, answer_cache=None, router=None, cache_scope=None):
         self.recognizer = sr.Recognizer()
         self.llm_client = llm_client
-        self.conversation_history = []
+        self.router = router or ModelRouter()
+        self.conversation_history = ConversationHistory(history_dir)
+        self.answer_cache = answer_cache
+        # Cached answers are only shared within this scope (the logged-in user); without one, within this assistant
+        self.cache_scope = cache_scope or uuid.uuid4().hex
         
     def listen(self):
         with sr.Microphone() as source:
@@ -138,7 +216,13 @@ class VoiceAssistant:
     
     def process_query(self, query, context=None):
         # Add the user query to conversation history
-        self.conversation_history.append({"role": "user", "content": query})
+        self.conversation_history.append("user", query)
+        
+        # Repeated questions about the same analysis results skip both LLM round trips
+        cached = self.answer_cache.get(query, context, self.cache_scope) if self.answer_cache else None
+        if cached:
+            self.conversation_history.append("assistant", cached["full"])
+            return cached
         
         try:
             # Construct prompt with conversation history for context and request for brevity
@@ -147,7 +231,7 @@ class VoiceAssistant:
             messages = [{"role": "system", "content": system_message}]
             
             # Add recent conversation history (up to last 6 messages)
-            recent_history = self.conversation_history[-6:] if len(self.conversation_history) > 6 else self.conversation_history
+            recent_history = self.conversation_history.recent(6)
             for msg in recent_history:
                 messages.append({"role": msg["role"], "content": msg["content"]})
             
@@ -159,21 +243,21 @@ class VoiceAssistant:
             # Add final instruction for brevity
             messages.append({"role": "system", "content": "Remember to keep your response brief and concise for voice output. Focus only on the most important information."})
             
-            response = self.llm_client.chat.completions.create(
-                model="meta-llama/Llama-3.2-11B-Vision-Instruct-Turbo",
-                messages=messages,
-                stream=False
-            )
+            response = self.router.complete(self.llm_client, "chat", messages)
             
             response_text = response.choices[0].message.content
             
             # Store full response in conversation history
-            self.conversation_history.append({"role": "assistant", "content": response_text})
+            self.conversation_history.append("assistant", response_text)
             
             # Create a concise version for voice output
-            concise_response = self.generate_concise_response(response_text, query, context)
+            concise_response, summarized = self.generate_concise_response(response_text, query, context)
             
-            return {"full": response_text, "concise": concise_response}
+            result = {"full": response_text, "concise": concise_response}
+            # A fallback summary would otherwise be served for the cache's whole TTL
+            if self.answer_cache and summarized:
+                self.answer_cache.put(query, result, context, self.cache_scope)
+            return result
         
         except Exception as e:
             st.error(f"Error processing query with LLM: {str(e)}")
@@ -181,18 +265,18 @@ class VoiceAssistant:
             return {"full": error_msg, "concise": error_msg}
     
     def generate_concise_response(self, full_response, query, context=None):
-        """Generate a concise version of the response for voice output"""
+        """Generate a concise version of the response for voice output.
+
+        Returns (concise_text, summarized); summarized is False when the
+        summarization call failed and the first sentences were used instead.
+        """
         try:
             summarize_messages = [
                 {"role": "system", "content": "You are a summarizer that creates very brief summaries for voice output."},
                 {"role": "user", "content": f"Summarize the following in 1-2 simple sentences for voice output:\n\n{full_response}"}
             ]
             
-            summary_response = self.llm_client.chat.completions.create(
-                model="meta-llama/Llama-3.2-11B-Vision-Instruct-Turbo",
-                messages=summarize_messages,
-                stream=False
-            )
+            summary_response = self.router.complete(self.llm_client, "summarization", summarize_messages)
             
             concise_text = summary_response.choices[0].message.content
             
@@ -201,52 +285,23 @@ class VoiceAssistant:
             if len(words) > 30:
                 concise_text = ' '.join(words[:30]) + "..."
                 
-            return concise_text
+            return concise_text, True
             
         except Exception as e:
             st.warning(f"Error creating concise response: {str(e)}")
             # Fall back to first 2 sentences of the full response
             sentences = full_response.split('.')[:2]
-            return '. '.join(sentences) + '.'
+            return '. '.join(sentences) + '.', False
     
     def speak(self, text):
         try:
-            # Create a temporary file for the TTS audio
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
-                st.info(f"Converting to speech: '{text}'")
-                
-                # Convert text to speech and save to temporary file
-                tts = gTTS(text=text, lang='en', slow=False)
-                tts.save(temp_audio.name)
-                
-                # Read the audio bytes
-                with open(temp_audio.name, 'rb') as audio_file:
-                    audio_bytes = audio_file.read()
-                
-                # Encode audio bytes to Base64
-                audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
-                
-                # Embed an HTML audio element with autoplay
-                audio_html = f"""
-                <audio autoplay>
-                    <source src="data:audio/mp3;base64,{audio_base64}" type="audio/mp3">
-                    Your browser does not support the audio element.
-                </audio>
-                """
-                st.markdown(audio_html, unsafe_allow_html=True)
+            st.info(f"Converting to speech: '{text}'")
             
-            # Clean up temp file after a short delay in a background thread
-            def cleanup_temp_file(filename, delay=5):
-                time.sleep(delay)
-                try:
-                    if os.path.exists(filename):
-                        os.unlink(filename)
-                except Exception as e:
-                    st.warning(f"Cleanup warning: {str(e)}")
-                    
-            cleanup_thread = threading.Thread(target=cleanup_temp_file, args=(temp_audio.name,))
-            cleanup_thread.daemon = True
-            cleanup_thread.start()
+            # Send the reply as one clip of raw bytes through st.audio instead of a base64
+            # data URI embedded in the page. Browsers only autoplay one element, so the
+            # sentence groups synthesized in parallel are joined rather than sent as separate clips
+            audio_bytes, audio_format = synthesize_speech(text)
+            st.audio(audio_bytes, format=audio_format, autoplay=True)
             
             return True
             
@@ -254,26 +309,24 @@ class VoiceAssistant:
             st.error(f"Error in text-to-speech: {str(e)}")
             return False
     
-    def save_conversation(self, directory):
+    def save_conversation(self):
+        # Turns are appended to the session file as they happen, so there is nothing left to write
         if not self.conversation_history:
             return None
-            
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"voice_conversation_{timestamp}.json"
-        filepath = os.path.join(directory, filename)
-        
-        with open(filepath, 'w') as f:
-            json.dump(self.conversation_history, f, indent=4)
-        
-        return filepath
+        return self.conversation_history.filepath
 
 class ImageAnalyzer:
-    def __init__(self):
+    def __init__(self, router=None, medicine_index=None, image_pool=None):
+        self.router = router or ModelRouter()
+        self.medicine_index = medicine_index
+        self.image_pool = image_pool
         self.api_key = os.getenv("TOGETHER_API_KEY")
         if not self.api_key:
             st.error("API key not found. Please check your .env file.")
             return
-        self.client = Together(api_key=self.api_key)
+        # TOGETHER_BASE_URL points the client at a local stand-in server for testing.
+        # The SDK's own retries are off, so a failing model goes straight to the router's failover
+        self.client = Together(api_key=self.api_key, base_url=os.getenv("TOGETHER_BASE_URL"), max_retries=0)
         
     def encode_image(self, image_file):
         try:
@@ -316,9 +369,10 @@ Return only the JSON output, without additional text or explanations."""
             return None
 
         try:
-            response = self.client.chat.completions.create(
-                model="meta-llama/Llama-3.2-11B-Vision-Instruct-Turbo",
-                messages=[
+            response = self.router.complete(
+                self.client,
+                "vision",
+                [
                     {
                         "role": "user",
                         "content": [
@@ -326,14 +380,16 @@ Return only the JSON output, without additional text or explanations."""
                             {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
                         ],
                     }
-                ],
-                stream=False
+                ]
             )
 
             full_response = response.choices[0].message.content
             json_match = re.search(r"\{.*\}", full_response, re.DOTALL)
             if json_match:
                 extracted_data = json.loads(json_match.group(0))
+                # Match OCR'd medicine names against the drug dictionary
+                if self.medicine_index:
+                    normalize_medicines(extracted_data, self.medicine_index)
                 return extracted_data
             return None
 
@@ -341,7 +397,8 @@ Return only the JSON output, without additional text or explanations."""
             st.error(f"Error analyzing prescription: {str(e)}")
             return None
 
-    def analyze_diagnostic_image(self, image_file):
+    def request_diagnosis(self, base64_image):
+        """Sends one encoded image to the vision model and returns the parsed analysis. Safe to call from worker threads."""
         prompt = """Analyze the provided medical image and provide analysis in this JSON format:
         {
             "Predicted_Disease": "<Predict accurate name of the Disease/Condition Name>",
@@ -351,37 +408,116 @@ Return only the JSON output, without additional text or explanations."""
             "Recommended_Actions": ["<Action 1>", "<Action 2>", "<Action 3>"]
         }
         Ensure the response is accurate and useful for a medical specialist. If the image is unclear, specify that in the Description field."""
-        
+
+        response = self.router.complete(
+            self.client,
+            "vision",
+            [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
+                    ],
+                }
+            ]
+        )
+
+        full_response = response.choices[0].message.content
+        json_match = re.search(r"\{.*\}", full_response, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group(0))
+        return None
+
+    def analyze_diagnostic_image(self, image_file):
         base64_image = self.encode_image(image_file)
         if not base64_image:
             return None
 
         try:
-            response = self.client.chat.completions.create(
-                model="meta-llama/Llama-3.2-11B-Vision-Instruct-Turbo",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
-                        ],
-                    }
-                ],
-                stream=False
-            )
-
-            full_response = response.choices[0].message.content
-            json_match = re.search(r"\{.*\}", full_response, re.DOTALL)
-            if json_match:
-                extracted_data = json.loads(json_match.group(0))
-                return extracted_data
-            return None
-
+            return self.request_diagnosis(base64_image)
         except Exception as e:
             st.error(f"Error analyzing diagnostic image: {str(e)}")
             return None
 
+    def analyze_diagnostic_images(self, image_files, max_workers=8):
+        """Analyzes several views of one case together and merges them into a single result.
+
+        Each image is decoded and downsized in the process pool and sent to the
+        model as soon as it is ready, with the images handled concurrently, so N
+        views take about as long as the slowest one. The vision models accept
+        one image per request, so each view is its own request.
+        """
+        start = time.perf_counter()
+        uploads = [image_file.read() for image_file in image_files]
+
+        def diagnose(data):
+            base64_image, info = preprocess_in_pool(data, self.image_pool)
+            if base64_image is None:
+                return info, None, info["error"], 0.0
+            request_start = time.perf_counter()
+            try:
+                return info, self.request_diagnosis(base64_image), None, time.perf_counter() - request_start
+            except Exception as e:
+                return info, None, str(e), time.perf_counter() - request_start
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(uploads)))) as pool:
+            outcomes = list(pool.map(diagnose, uploads))
+
+        per_image = []
+        for i, (image_file, (info, result, error, seconds)) in enumerate(zip(image_files, outcomes)):
+            name = getattr(image_file, "name", f"Image {i + 1}")
+            if error:
+                st.error(f"Error analyzing {name}: {error}")
+            per_image.append({
+                "Image": name,
+                "Result": result,
+                "Error": error,
+                "Preprocess_Seconds": info.get("seconds"),
+                "Model_Seconds": round(seconds, 3),
+            })
+
+        merged = merge_diagnostics(per_image)
+        if merged:
+            merged["Total_Seconds"] = round(time.perf_counter() - start, 3)
+        return merged
+
+# Render one page of the conversation as a single markdown element
+def render_conversation_page(history, page_number):
+    rendered = []
+    for message in history.page(page_number):
+        if message["role"] == "user":
+            rendered.append(f'<div class="user-message">👤 You: {message["content"]}</div>')
+        else:
+            rendered.append(f'<div class="assistant-message">🤖 Assistant: {message["content"]}</div>')
+    if rendered:
+        st.markdown("\n".join(rendered), unsafe_allow_html=True)
+
+# Result cards for a diagnostic analysis
+def render_diagnostic_results(results):
+    st.markdown('<div class="results-card">', unsafe_allow_html=True)
+    st.subheader("Disease Prediction")
+    st.write(f"Predicted Disease: {results.get('Predicted_Disease', 'N/A')}")
+    st.write(f"Confidence Score: {results.get('Confidence_Score', 'N/A')}")
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="results-card">', unsafe_allow_html=True)
+    st.subheader("Description")
+    st.write(results.get('Description', 'N/A'))
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="results-card">', unsafe_allow_html=True)
+    st.subheader("Possible Causes")
+    for cause in results.get('Possible_Causes', []):
+        st.write(f"• {cause}")
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="results-card">', unsafe_allow_html=True)
+    st.subheader("Recommended Actions")
+    for action in results.get('Recommended_Actions', []):
+        st.write(f"• {action}")
+    st.markdown('</div>', unsafe_allow_html=True)
+
 def main():
     st.set_page_config(
         page_title="Medical Image Analysis",
@@ -411,11 +547,12 @@ def main():
     
     page = st.sidebar.radio("", ["Prescription Analysis", "Diagnostic Image Analysis", "Voice Assistant"])
     
-    analyzer = ImageAnalyzer()
+    analyzer = ImageAnalyzer(get_model_router(), get_medicine_index(), get_image_pool())
     
     # Initialize Voice Assistant
     if "voice_assistant" not in st.session_state:
-        st.session_state.voice_assistant = VoiceAssistant(analyzer.client)
+        st.session_state.voice_assistant = VoiceAssistant(analyzer.client, voice_dir, get_answer_cache(), get_model_router(),
+                                                          st.session_state.get("username"))
     
     # Initialize analysis results for context in voice assistant
     if "analysis_results" not in st.session_state:
@@ -474,73 +611,85 @@ def main():
     elif page == "Diagnostic Image Analysis":
         st.markdown('<div class="section-header">', unsafe_allow_html=True)
         st.title("Diagnostic Image Analysis")
-        st.write("Upload a diagnostic image for detailed analysis")
+        st.write("Upload a diagnostic image for detailed analysis, or several views of the same case to compare them together")
         st.markdown('</div>', unsafe_allow_html=True)
         
-        uploaded_file = st.file_uploader("Choose a diagnostic image", type=["jpg", "jpeg", "png"])
+        mode = st.radio("Mode", ["Single image", "Multiple images"], horizontal=True)
         
-        if uploaded_file:
-            col1, col2 = st.columns(2)
+        if mode == "Single image":
+            uploaded_file = st.file_uploader("Choose a diagnostic image", type=["jpg", "jpeg", "png"])
             
-            with col1:
-                st.markdown('<div class="image-container">', unsafe_allow_html=True)
-                st.image(uploaded_file, use_container_width=True, caption="Uploaded Diagnostic Image")
-                st.markdown('</div>', unsafe_allow_html=True)
+            if uploaded_file:
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown('<div class="image-container">', unsafe_allow_html=True)
+                    st.image(uploaded_file, use_container_width=True, caption="Uploaded Diagnostic Image")
+                    st.markdown('</div>', unsafe_allow_html=True)
+                
+                with col2:
+                    if st.button("🔬 Analyze Image", type="primary"):
+                        with st.spinner("🔄 Analyzing image..."):
+                            results = analyzer.analyze_diagnostic_image(uploaded_file)
+                            
+                            if results:
+                                # Save the JSON data
+                                saved_path = save_json_data(results, diagnostics_dir, "diagnostic")
+                                
+                                # Store results for voice assistant context
+                                st.session_state.analysis_results = results
+                                
+                                st.success(f"✅ Analysis Complete! Data saved to {saved_path}")
+                                render_diagnostic_results(results)
+                            else:
+                                st.error("❌ Analysis failed. Please try again with a clearer image.")
+        
+        else:
+            uploaded_files = st.file_uploader("Choose diagnostic images (e.g. several MRI slices)", type=["jpg", "jpeg", "png"],
+                                              accept_multiple_files=True)
             
-            with col2:
-                if st.button("🔬 Analyze Image", type="primary"):
-                    with st.spinner("🔄 Analyzing image..."):
-                        results = analyzer.analyze_diagnostic_image(uploaded_file)
+            if uploaded_files:
+                columns = st.columns(min(4, len(uploaded_files)))
+                for i, uploaded_file in enumerate(uploaded_files):
+                    with columns[i % len(columns)]:
+                        st.image(uploaded_file, use_container_width=True, caption=uploaded_file.name)
+                
+                if st.button(f"🔬 Analyze {len(uploaded_files)} Images", type="primary"):
+                    with st.spinner("🔄 Analyzing images..."):
+                        results = analyzer.analyze_diagnostic_images(uploaded_files)
                         
                         if results:
-                            # Save the JSON data
                             saved_path = save_json_data(results, diagnostics_dir, "diagnostic")
-                            
-                            # Store results for voice assistant context
                             st.session_state.analysis_results = results
                             
-                            st.success(f"✅ Analysis Complete! Data saved to {saved_path}")
+                            st.success(f"✅ Analysis of {len(uploaded_files)} images complete in {results['Total_Seconds']:.1f}s! Data saved to {saved_path}")
+                            render_diagnostic_results(results)
                             
                             st.markdown('<div class="results-card">', unsafe_allow_html=True)
-                            st.subheader("Disease Prediction")
-                            st.write(f"Predicted Disease: {results.get('Predicted_Disease', 'N/A')}")
-                            st.write(f"Confidence Score: {results.get('Confidence_Score', 'N/A')}")
-                            st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            st.markdown('<div class="results-card">', unsafe_allow_html=True)
-                            st.subheader("Description")
-                            st.write(results.get('Description', 'N/A'))
-                            st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            st.markdown('<div class="results-card">', unsafe_allow_html=True)
-                            st.subheader("Possible Causes")
-                            for cause in results.get('Possible_Causes', []):
-                                st.write(f"• {cause}")
-                            st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            st.markdown('<div class="results-card">', unsafe_allow_html=True)
-                            st.subheader("Recommended Actions")
-                            for action in results.get('Recommended_Actions', []):
-                                st.write(f"• {action}")
+                            st.subheader("Per-Image Results")
+                            st.write(f"Agreement: {results['Agreement']}")
+                            st.table(pd.DataFrame(results["Images"]).drop(columns=["Description"]).fillna(""))
                             st.markdown('</div>', unsafe_allow_html=True)
                         else:
-                            st.error("❌ Analysis failed. Please try again with a clearer image.")
+                            st.error("❌ Analysis failed. Please try again with clearer images.")
     
     else:  # Voice Assistant Page
         st.markdown('<div class="section-header">', unsafe_allow_html=True)
         st.title("Medical Voice Assistant")
         st.write("Interact with the AI using your voice or text")
+        cache_stats = get_answer_cache().stats()
+        st.caption(f"Answer cache: {cache_stats['hits']} of {cache_stats['hits'] + cache_stats['misses']} questions answered from cache ({cache_stats['hit_rate']:.0%})")
         st.markdown('</div>', unsafe_allow_html=True)
         
         # Display conversation history
         st.markdown('<div class="conversation-container">', unsafe_allow_html=True)
         st.subheader("Conversation History")
         
-        for message in st.session_state.voice_assistant.conversation_history:
-            if message["role"] == "user":
-                st.markdown(f'<div class="user-message">👤 You: {message["content"]}</div>', unsafe_allow_html=True)
-            else:
-                st.markdown(f'<div class="assistant-message">🤖 Assistant: {message["content"]}</div>', unsafe_allow_html=True)
+        history = st.session_state.voice_assistant.conversation_history
+        page_number = 1
+        if history.page_count() > 1:
+            page_number = st.number_input("Page (1 = most recent)", min_value=1, max_value=history.page_count(), value=1, step=1)
+        render_conversation_page(history, page_number)
         
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -571,7 +720,7 @@ def main():
         with col3:
             if st.button("💾 Save Conversation"):
                 if st.session_state.voice_assistant.conversation_history:
-                    saved_path = st.session_state.voice_assistant.save_conversation(voice_dir)
+                    saved_path = st.session_state.voice_assistant.save_conversation()
                     if saved_path:
                         st.success(f"Conversation saved to {saved_path}")
                     else:
@@ -580,7 +729,7 @@ def main():
                     st.warning("No conversation to save.")
             
             if st.button("🔄 Reset Conversation"):
-                st.session_state.voice_assistant.conversation_history = []
+                st.session_state.voice_assistant.conversation_history.reset()
                 st.success("Conversation reset.")
                 st.rerun()
         
@@ -0,0 +1,181 @@
+import collections
+import functools
+import os
+import re
+
+# Local drug dictionary, one name per line. Point MEDICLOCK_DRUG_DICTIONARY at a
+# larger list (e.g. an export of a national formulary) to extend it.
+DEFAULT_DICTIONARY = os.path.join("data", "drugs", "medicine_names.txt")
+
+# Dosage-form words OCR often glues onto the medicine name ("Tab. Augmentin", "Tr Belladonna")
+DOSAGE_FORM_WORDS = {
+    "cap", "caps", "capsule", "cream", "drop", "drops", "gel", "inj", "injection", "oint", "ointment",
+    "susp", "suspension", "syp", "syr", "syrup", "tab", "tabs", "tablet", "tr", "tinct", "tincture",
+}
+
+# Names at least this long may be replaced automatically when they are one edit away from a dictionary name
+AUTO_REPLACE_MIN_LENGTH = 8
+
+# Strengths and volumes such as "500mg", "2.5 ml" or "10%"
+STRENGTH_PATTERN = re.compile(r"\b\d+(\.\d+)?\s*(mg|mcg|g|ml|iu|units?|%)?(?![a-z0-9])")
+
+def normalize_name(name):
+    """Lowercase words without punctuation, strengths or dosage-form words."""
+    text = STRENGTH_PATTERN.sub(" ", str(name).lower())
+    words = re.sub(r"[^a-z0-9\s]", " ", text).split()
+    return " ".join(word for word in words if word not in DOSAGE_FORM_WORDS)
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance, or max_distance + 1 as soon as it is certain to exceed max_distance."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+class MedicineIndex:
+    """Resolves OCR'd medicine names to dictionary names.
+
+    Candidates come from a trigram inverted index and are ranked by edit
+    distance. Posting lists are split by name length and only names within
+    `length_tolerance` characters of the query are counted, using the
+    `max_grams` rarest trigrams of the query, which keeps lookups around a
+    millisecond on 100k+ names.
+
+    resolve() returns the closest name as a suggestion; for names of several
+    words it also tries each word, so "Tr Billedonna" suggests "Belladonna".
+    match() only returns a name that is safe to substitute without asking:
+    the whole extracted name matches exactly or is a single edit away from a
+    long dictionary name. Similar drug names ("Misoprostol"/"Bisoprolol") are
+    only a few edits apart, so anything looser stays a suggestion. Lookups are
+    cached.
+    """
+
+    def __init__(self, names, min_similarity=0.7, candidates=25, length_tolerance=1, max_grams=10,
+                 cache_size=10000):
+        self.names = []
+        self.normalized = []
+        self.postings = collections.defaultdict(lambda: collections.defaultdict(list))
+        for name in dict.fromkeys(n.strip() for n in names if n.strip()):
+            normalized = normalize_name(name)
+            if not normalized:
+                continue
+            name_id = len(self.names)
+            self.names.append(name)
+            self.normalized.append(normalized)
+            for gram in trigrams(normalized):
+                self.postings[gram][len(normalized)].append(name_id)
+        self.postings = {gram: dict(by_length) for gram, by_length in self.postings.items()}
+
+        self.exact = {normalized: i for i, normalized in enumerate(self.normalized)}
+        self.min_similarity = min_similarity
+        self.candidates = candidates
+        self.length_tolerance = length_tolerance
+        self.max_grams = max_grams
+        self.lookup = functools.lru_cache(maxsize=cache_size)(self._lookup)
+
+    @classmethod
+    def from_file(cls, path=None, **kwargs):
+        path = path or os.getenv("MEDICLOCK_DRUG_DICTIONARY", DEFAULT_DICTIONARY)
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f, **kwargs)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _best_match(self, query):
+        """Returns (name_id, similarity, distance) for the closest dictionary name, or (None, 0.0, None)."""
+        if query in self.exact:
+            return self.exact[query], 1.0, 0
+
+        lengths = range(len(query) - self.length_tolerance, len(query) + self.length_tolerance + 1)
+        postings = []
+        for gram in trigrams(query):
+            by_length = self.postings.get(gram)
+            if by_length:
+                postings.append([by_length[n] for n in lengths if n in by_length])
+        postings.sort(key=lambda lists: sum(map(len, lists)))
+
+        counts = collections.Counter()
+        for lists in postings[:self.max_grams]:
+            for ids in lists:
+                counts.update(ids)
+
+        best_id, best_similarity, best_distance = None, 0.0, None
+        for name_id, _ in counts.most_common(self.candidates):
+            candidate = self.normalized[name_id]
+            longest = max(len(query), len(candidate))
+            max_distance = int(longest * (1 - max(self.min_similarity, best_similarity)))
+            distance = edit_distance(query, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            similarity = 1 - distance / longest
+            if similarity > best_similarity:
+                best_id, best_similarity, best_distance = name_id, similarity, distance
+        return best_id, best_similarity, best_distance
+
+    def _lookup(self, name):
+        """Returns (suggested_name, similarity, replaceable) for an extracted name, or (None, 0.0, False)."""
+        query = normalize_name(name)
+        if not query:
+            return None, 0.0, False
+
+        best_id, best_similarity, distance = self._best_match(query)
+        replaceable = best_id is not None and (
+            distance == 0 or (distance == 1 and len(query) >= AUTO_REPLACE_MIN_LENGTH)
+        )
+
+        # Single words of a longer name are only ever suggestions: "Metformin Glimepiride" is not Metformin
+        words = query.split()
+        if not replaceable and len(words) > 1:
+            for word in words:
+                if len(word) < 4:
+                    continue
+                name_id, similarity, _ = self._best_match(word)
+                if similarity > best_similarity:
+                    best_id, best_similarity, replaceable = name_id, similarity, False
+
+        if best_id is None or best_similarity < self.min_similarity:
+            return None, 0.0, False
+        return self.names[best_id], round(best_similarity, 3), replaceable
+
+    def resolve(self, name):
+        """Returns (dictionary_name, similarity) for the closest name, or (None, 0.0) if nothing is close."""
+        suggestion, similarity, _ = self.lookup(name)
+        return suggestion, similarity
+
+    def match(self, name):
+        """Returns the dictionary name if the extracted name can safely be replaced by it, else None."""
+        suggestion, _, replaceable = self.lookup(name)
+        return suggestion if replaceable else None
+
+def normalize_medicines(prescription, index):
+    """Replaces extracted medicine names that match a dictionary name, keeping the original as Extracted_Medicine.
+
+    Names that are only close to a dictionary name are left alone and the
+    candidate is stored as Suggested_Medicine for the user to check.
+    """
+    for med in prescription.get("Medicines", []):
+        extracted = med.get("Medicine")
+        if not extracted:
+            continue
+        name = index.match(extracted)
+        if name:
+            if name != extracted:
+                med["Extracted_Medicine"] = extracted
+                med["Medicine"] = name
+            continue
+        suggestion, _ = index.resolve(extracted)
+        if suggestion and suggestion != extracted:
+            med["Suggested_Medicine"] = suggestion
+    return prescription
@@ -0,0 +1,173 @@
+import collections
+import os
+import threading
+import time
+
+# Models tried for each task, in order of preference. Override a task with a
+# comma-separated list in MEDICLOCK_MODELS_<TASK>, e.g. MEDICLOCK_MODELS_CHAT.
+DEFAULT_ROUTES = {
+    # The 11B model is already the smallest vision model, so the fallback is a mixture-of-experts
+    # model with 17B active parameters rather than the much slower 90B model
+    "vision": [
+        "meta-llama/Llama-3.2-11B-Vision-Instruct-Turbo",
+        "meta-llama/Llama-4-Scout-17B-16E-Instruct",
+    ],
+    "chat": [
+        "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo",
+        "meta-llama/Llama-3.2-3B-Instruct-Turbo",
+    ],
+    "summarization": [
+        "meta-llama/Llama-3.2-3B-Instruct-Turbo",
+        "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo",
+    ],
+}
+
+# A model counts as degraded for a task once its rolling p95 latency (seconds)
+# or error rate goes over these limits
+DEFAULT_LATENCY_THRESHOLDS = {"vision": 15.0, "chat": 6.0, "summarization": 3.0}
+
+def routes_from_env(routes=None):
+    routes = {task: list(models) for task, models in (routes or DEFAULT_ROUTES).items()}
+    for task in list(routes):
+        configured = os.getenv(f"MEDICLOCK_MODELS_{task.upper()}")
+        if configured:
+            routes[task] = [model.strip() for model in configured.split(",") if model.strip()]
+    return routes
+
+class ModelStats:
+    """Rolling latency and error window for one model, plus its circuit breaker state.
+
+    Samples older than `window_seconds` are dropped, so a model that was
+    degraded a while ago gets traffic again once its bad samples age out.
+    """
+
+    def __init__(self, window, window_seconds):
+        self.samples = collections.deque(maxlen=window)
+        self.window_seconds = window_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def prune(self, now):
+        while self.samples and now - self.samples[0][0] > self.window_seconds:
+            self.samples.popleft()
+
+    def record(self, latency, ok):
+        self.samples.append((time.monotonic(), latency, ok))
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+
+    def p95_latency(self):
+        latencies = sorted(latency for _, latency, ok in self.samples if ok)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+class ModelRouter:
+    """Picks a model per task type and fails over when a model is slow, failing or down.
+
+    Healthy models are tried in configured order before degraded ones. After
+    `failure_threshold` consecutive failures a model's circuit opens and it is
+    skipped for `cooldown` seconds; then a single trial request is let through
+    and the circuit closes again if it succeeds.
+    """
+
+    def __init__(self, routes=None, latency_thresholds=None, error_threshold=0.3,
+                 failure_threshold=3, cooldown=30.0, window=50, window_seconds=300.0, min_samples=5):
+        self.routes = routes_from_env(routes)
+        self.latency_thresholds = dict(DEFAULT_LATENCY_THRESHOLDS, **(latency_thresholds or {}))
+        self.error_threshold = error_threshold
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.window = window
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _stats(self, model):
+        if model not in self.stats:
+            self.stats[model] = ModelStats(self.window, self.window_seconds)
+        return self.stats[model]
+
+    def _is_degraded(self, task, stats):
+        if len(stats.samples) < self.min_samples:
+            return False
+        return (stats.error_rate() > self.error_threshold
+                or stats.p95_latency() > self.latency_thresholds.get(task, float("inf")))
+
+    def _circuit_allows(self, stats, now):
+        if stats.opened_at is None:
+            return True
+        return now - stats.opened_at >= self.cooldown and not stats.trial_in_flight
+
+    def _acquire(self, model):
+        """Claims a model for one request; only one trial request may pass a half-open circuit."""
+        with self.lock:
+            stats = self._stats(model)
+            if not self._circuit_allows(stats, time.monotonic()):
+                return False
+            if stats.opened_at is not None:
+                stats.trial_in_flight = True
+            return True
+
+    def candidates(self, task):
+        """Models to try for a task, healthy ones first; models with an open circuit are left out."""
+        if task not in self.routes:
+            raise ValueError(f"No models configured for task '{task}'")
+
+        now = time.monotonic()
+        with self.lock:
+            healthy, degraded = [], []
+            for model in self.routes[task]:
+                stats = self._stats(model)
+                stats.prune(now)
+                if not self._circuit_allows(stats, now):
+                    continue
+                (degraded if self._is_degraded(task, stats) else healthy).append(model)
+            return healthy + degraded
+
+    def record(self, model, latency, ok):
+        with self.lock:
+            stats = self._stats(model)
+            stats.record(latency, ok)
+            stats.trial_in_flight = False
+            if ok:
+                stats.opened_at = None
+            elif stats.consecutive_failures >= self.failure_threshold or stats.opened_at is not None:
+                stats.opened_at = time.monotonic()
+
+    def complete(self, client, task, messages, **kwargs):
+        """Runs a chat completion for `task`, failing over between models. Raises the last error if all fail."""
+        last_error = None
+        for model in self.candidates(task):
+            if not self._acquire(model):
+                continue
+            start = time.perf_counter()
+            try:
+                response = client.chat.completions.create(model=model, messages=messages, stream=False, **kwargs)
+            except Exception as e:
+                self.record(model, time.perf_counter() - start, ok=False)
+                last_error = e
+                continue
+            self.record(model, time.perf_counter() - start, ok=True)
+            return response
+
+        raise last_error or RuntimeError(f"All models for '{task}' are unavailable, try again shortly")
+
+    def snapshot(self):
+        """Per-model p95 latency, error rate and circuit state."""
+        with self.lock:
+            return {
+                model: {
+                    "requests": len(stats.samples),
+                    "p95_latency_s": round(stats.p95_latency(), 3),
+                    "error_rate": round(stats.error_rate(), 3),
+                    "circuit": "open" if stats.opened_at is not None else "closed",
+                }
+                for model, stats in self.stats.items()
+            }
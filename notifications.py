@@ -0,0 +1,262 @@
+import collections
+import datetime
+import heapq
+import itertools
+import json
+import os
+import smtplib
+import threading
+import time
+import urllib.request
+from email.message import EmailMessage
+
+import pyttsx3
+from plyer import notification as desktop_notification
+
+# Reminder delivery for the Tk reminder apps. Every channel has its own worker
+# thread and retry queue, so a slow or failing channel never holds up the
+# others or the Tk scheduler. Doses due in the same minute are coalesced into
+# one message per patient.
+
+class Notification:
+    def __init__(self, patient, title, message, speech=None):
+        self.patient = patient
+        self.title = title
+        self.message = message
+        self.speech = speech or message
+        self.created = time.monotonic()
+
+    def as_dict(self):
+        return {"patient": self.patient, "title": self.title, "message": self.message}
+
+# ---------------------------------------------------------------------------
+# Channels
+# ---------------------------------------------------------------------------
+
+class Channel:
+    name = "channel"
+
+    def send(self, notification):
+        """Delivers one notification; raising an exception schedules a retry."""
+        raise NotImplementedError
+
+class DesktopChannel(Channel):
+    name = "desktop"
+
+    def send(self, notification):
+        desktop_notification.notify(title=notification.title, message=notification.message, timeout=10)
+
+class SpeechChannel(Channel):
+    """Speaks reminders with pyttsx3. The engine is created on the worker thread that uses it."""
+
+    name = "speech"
+
+    def __init__(self):
+        self.engine = None
+
+    def send(self, notification):
+        if self.engine is None:
+            self.engine = pyttsx3.init()
+        self.engine.say(notification.speech)
+        self.engine.runAndWait()
+
+class WebhookChannel(Channel):
+    """POSTs the notification as JSON to an HTTP endpoint."""
+
+    name = "webhook"
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def payload(self, notification):
+        return notification.as_dict()
+
+    def send(self, notification):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(self.payload(notification)).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class SMSChannel(WebhookChannel):
+    """Sends text messages through an HTTP SMS gateway."""
+
+    name = "sms"
+
+    def __init__(self, url, to, timeout=10):
+        super().__init__(url, timeout)
+        self.to = to
+
+    def payload(self, notification):
+        return {"to": self.to, "text": notification.message}
+
+class EmailChannel(Channel):
+    name = "email"
+
+    def __init__(self, host, port, sender, to, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.to = to
+        self.timeout = timeout
+
+    def send(self, notification):
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = self.to
+        email["Subject"] = notification.title
+        email.set_content(notification.message)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(email)
+
+def channels_from_env():
+    """Optional remote channels configured through environment variables."""
+    channels = []
+    if os.getenv("MEDICLOCK_WEBHOOK_URL"):
+        channels.append(WebhookChannel(os.getenv("MEDICLOCK_WEBHOOK_URL")))
+    if os.getenv("MEDICLOCK_SMS_GATEWAY_URL") and os.getenv("MEDICLOCK_SMS_TO"):
+        channels.append(SMSChannel(os.getenv("MEDICLOCK_SMS_GATEWAY_URL"), os.getenv("MEDICLOCK_SMS_TO")))
+    if os.getenv("MEDICLOCK_SMTP_HOST") and os.getenv("MEDICLOCK_EMAIL_TO"):
+        channels.append(EmailChannel(
+            os.getenv("MEDICLOCK_SMTP_HOST"),
+            int(os.getenv("MEDICLOCK_SMTP_PORT", "25")),
+            os.getenv("MEDICLOCK_EMAIL_FROM", "mediclock@localhost"),
+            os.getenv("MEDICLOCK_EMAIL_TO")
+        ))
+    return channels
+
+# ---------------------------------------------------------------------------
+# Dispatcher
+# ---------------------------------------------------------------------------
+
+class ChannelWorker(threading.Thread):
+    """Delivers notifications for one channel, retrying failures with exponential backoff."""
+
+    def __init__(self, channel, max_attempts, base_delay, max_delay):
+        super().__init__(name=f"notify-{channel.name}", daemon=True)
+        self.channel = channel
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Heap of (due_time, sequence, attempt, notification); retries go back in with a later due_time
+        self.queue = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.latencies = collections.deque(maxlen=500)
+
+    def submit(self, notification, attempt=1, delay=0.0):
+        with self.condition:
+            heapq.heappush(self.queue, (time.monotonic() + delay, next(self.sequence), attempt, notification))
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+
+    def pending(self):
+        with self.condition:
+            return len(self.queue)
+
+    def _next(self):
+        with self.condition:
+            while not self.stopping:
+                if self.queue:
+                    wait = self.queue[0][0] - time.monotonic()
+                    if wait <= 0:
+                        return heapq.heappop(self.queue)
+                    self.condition.wait(wait)
+                else:
+                    self.condition.wait()
+            return None
+
+    def run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            _, _, attempt, notification = item
+            try:
+                self.channel.send(notification)
+            except Exception:
+                if attempt >= self.max_attempts:
+                    self.failed += 1
+                    continue
+                self.retries += 1
+                self.submit(notification, attempt + 1, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                continue
+            self.delivered += 1
+            self.latencies.append(time.monotonic() - notification.created)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        percentile = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3) if latencies else None
+        return {
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retries": self.retries,
+            "pending": self.pending(),
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+        }
+
+class NotificationDispatcher:
+    """Fans reminders out to every channel without blocking the caller.
+
+    notify_due() coalesces all doses due for a patient in one minute into a
+    single notification and ignores repeats for the same patient, day and
+    minute, since the reminder apps check the schedule more than once a minute.
+    """
+
+    def __init__(self, channels, max_attempts=5, base_delay=2.0, max_delay=300.0):
+        self.workers = {channel.name: ChannelWorker(channel, max_attempts, base_delay, max_delay) for channel in channels}
+        self.recent_keys = collections.deque(maxlen=10000)
+        self.recent_key_set = set()
+
+    def start(self):
+        for worker in self.workers.values():
+            worker.start()
+        return self
+
+    def stop(self):
+        for worker in self.workers.values():
+            worker.stop()
+
+    def notify(self, notification):
+        for worker in self.workers.values():
+            worker.submit(notification)
+
+    def notify_due(self, patient, due, current_time, day=None):
+        """Sends one reminder for the (medicine, details) pairs due now. Returns the message, or None if already sent.
+
+        `day` defaults to today's date, so the same HH:MM fires again the next day.
+        """
+        key = (patient, day or datetime.date.today().isoformat(), current_time)
+        if not due or key in self.recent_key_set:
+            return None
+        if len(self.recent_keys) == self.recent_keys.maxlen:
+            self.recent_key_set.discard(self.recent_keys[0])
+        self.recent_keys.append(key)
+        self.recent_key_set.add(key)
+
+        doses = ", ".join(f"{medicine} - {details['dosage']}" for medicine, details in due)
+        spoken = ", and ".join(f"{medicine}, {details['dosage']}" for medicine, details in due)
+        message = f"Time to take {doses}"
+        self.notify(Notification(
+            patient,
+            "Medicine Reminder",
+            message,
+            speech=f"Hey {patient}, it's time to take your {spoken}"
+        ))
+        return message
+
+    def stats(self):
+        return {name: worker.stats() for name, worker in self.workers.items()}
@@ -0,0 +1,65 @@
+import json
+
+# Shared reminder logic used by the Tk reminder apps and the headless benchmark driver.
+# Nothing in here touches Tk, the sound card or the notification system.
+
+def format_timings(timings):
+    """Converts prescription timings ("8", "8 AM", "07:25") to HH:MM strings."""
+    formatted_timings = []
+    for t in timings:
+        t = str(t).strip()
+        if not t:
+            continue
+
+        suffix = t[-2:].upper()
+        if suffix in ("AM", "PM"):
+            hour, _, minute = t[:-2].strip().partition(":")
+            hour = int(hour) % 12 + (12 if suffix == "PM" else 0)
+            formatted_timings.append(f"{hour:02d}:{int(minute or 0):02d}")
+        elif ":" not in t:
+            formatted_timings.append(f"{int(t):02d}:00")
+        else:
+            formatted_timings.append(t)
+
+    return formatted_timings
+
+def parse_prescription(data, medicine_index=None):
+    """Returns (patient_name, medicine_schedule) from prescription JSON data.
+
+    With a MedicineIndex, names that match a dictionary name are replaced by
+    it, so older prescriptions saved before normalization use the same keys.
+    Every prescription line keeps its own entry: a line whose matched name is
+    already taken by another line keeps its extracted name, and lines with
+    identical names share one entry with all their timings.
+    """
+    patient_name = data.get("Patient", {}).get("Name", "Unknown Patient")
+
+    medicine_schedule = {}
+    for med in data.get("Medicines", []):
+        name = med.get("Medicine", "Unknown Medicine")
+        if medicine_index:
+            matched = medicine_index.match(name)
+            if matched and matched not in medicine_schedule:
+                name = matched
+        timings = format_timings(med.get("Timings", []))
+        if name in medicine_schedule:
+            scheduled = medicine_schedule[name]["timings"]
+            scheduled.extend(t for t in timings if t not in scheduled)
+            continue
+        medicine_schedule[name] = {
+            "dosage": med.get("Dosage", "Unknown Dosage"),
+            "timings": timings
+        }
+
+    return patient_name, medicine_schedule
+
+def load_prescription(json_file, medicine_index=None):
+    """Loads patient name and medicine schedule from a prescription JSON file."""
+    with open(json_file, "r") as file:
+        data = json.load(file)
+    return parse_prescription(data, medicine_index)
+
+def due_medicines(schedule, current_time):
+    """Returns the (medicine, details) pairs scheduled at current_time (HH:MM)."""
+    return [(medicine, details) for medicine, details in schedule.items()
+            if current_time in details["timings"]]
@@ -0,0 +1,248 @@
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Crash-safe JSON persistence for users.json and the records under data/.
+# Files are replaced atomically (write a temp file, fsync, rename over the
+# target), so a crash leaves either the old or the new content, never a
+# truncated file. GroupCommitWriter additionally batches many records into
+# one fsync of a journal for bulk ingestion.
+
+def fsync_directory(directory):
+    """Makes a rename in `directory` durable. Directories cannot be opened for fsync on Windows."""
+    if fcntl is None:
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write_json(path, data, durable=True, **dump_kwargs):
+    """Writes data as JSON to path through a temp file in the same directory and an atomic rename.
+
+    With durable=False the data is not fsynced, which keeps the file intact on
+    a process crash but not necessarily on power loss.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+    if durable:
+        fsync_directory(directory)
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Exclusive advisory lock on `path` (through `path`.lock) for read-modify-write cycles.
+
+    Works across processes and across threads of one process. It is not
+    re-entrant: do not take the same lock again inside the block.
+    """
+    with open(path + ".lock", "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after about 10 seconds, so keep trying
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# Names handed out by unique_path() whose files may not exist yet
+_reserved_paths = set()
+_reserved_lock = threading.Lock()
+
+def unique_path(directory, stem, suffix=".json"):
+    """`stem` + suffix in directory, or stem_1, stem_2, ... if that name is taken or handed out already."""
+    with _reserved_lock:
+        _reserved_paths.difference_update([path for path in _reserved_paths if os.path.exists(path)])
+        path = os.path.join(directory, stem + suffix)
+        counter = 1
+        while os.path.exists(path) or path in _reserved_paths:
+            path = os.path.join(directory, f"{stem}_{counter}{suffix}")
+            counter += 1
+        _reserved_paths.add(path)
+        return path
+
+def create_unique_file(directory, stem, suffix):
+    """Creates a new empty file named stem + suffix (or stem_1, stem_2, ...) and returns its path.
+
+    The name is claimed with O_EXCL, so two threads or processes never get the
+    same file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    counter = 0
+    while True:
+        name = f"{stem}{suffix}" if counter == 0 else f"{stem}_{counter}{suffix}"
+        path = os.path.join(directory, name)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return path
+        except FileExistsError:
+            counter += 1
+
+class GroupCommitWriter:
+    """Writes JSON records in batches that share a single fsync.
+
+    Records handed to write() by any number of threads are collected for up
+    to `max_delay` seconds (or `max_batch` records) and appended to a journal
+    that is fsynced once per batch. Each caller then renames its record into
+    place without an fsync of its own, and write() returns. Once the journal
+    grows past `checkpoint_bytes`, the page cache is flushed and the journal
+    is cleared. After a crash, recover() rewrites every record still in the
+    journal, so no record whose write() returned is lost.
+    """
+
+    def __init__(self, journal_path, max_batch=256, max_delay=0.001, checkpoint_bytes=16 * 1024 * 1024):
+        self.journal_path = journal_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.checkpoint_bytes = checkpoint_bytes
+        self.pending = []
+        self.condition = threading.Condition()
+        self.closed = False
+        # Journaled records whose files are still being written; the journal is only cleared when this is 0
+        self.in_flight = 0
+        # Files written since the last checkpoint, fsynced one by one where os.sync() is unavailable
+        self.unsynced = []
+        self.batches = 0
+        self.records = 0
+        self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self.thread.start()
+
+    def write(self, path, data, **dump_kwargs):
+        """Blocks until the record is in the journal, then writes the file itself."""
+        path = os.path.abspath(path)
+        done = threading.Event()
+        entry = {"line": json.dumps({"path": path, "data": data, "dump_kwargs": dump_kwargs}), "done": done, "error": None}
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("GroupCommitWriter is closed")
+            self.pending.append(entry)
+            self.condition.notify_all()
+        done.wait()
+        if entry["error"]:
+            raise entry["error"]
+
+        try:
+            atomic_write_json(path, data, durable=False, **dump_kwargs)
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.unsynced.append(path)
+                self.condition.notify_all()
+        return path
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                # Give other writers a moment to join the batch
+                deadline = time.monotonic() + self.max_delay
+                while len(self.pending) < self.max_batch and not self.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+
+            try:
+                journal_size = self._append(batch)
+            except Exception as e:
+                for entry in batch:
+                    entry["error"] = e
+                    entry["done"].set()
+                continue
+
+            with self.condition:
+                self.in_flight += len(batch)
+                self.batches += 1
+                self.records += len(batch)
+            for entry in batch:
+                entry["done"].set()
+
+            if journal_size >= self.checkpoint_bytes:
+                self.checkpoint()
+
+    def _append(self, batch):
+        """Appends a batch to the journal with one fsync and returns the journal size."""
+        with open(self.journal_path, "ab") as f:
+            f.write(("\n".join(entry["line"] for entry in batch) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def checkpoint(self):
+        """Flushes written records to disk and clears the journal."""
+        with self.condition:
+            while self.in_flight:
+                self.condition.wait()
+            unsynced, self.unsynced = self.unsynced, []
+            if hasattr(os, "sync"):
+                os.sync()
+            else:
+                for path in unsynced:
+                    with contextlib.suppress(OSError), open(path, "rb+") as f:
+                        os.fsync(f.fileno())
+            with open(self.journal_path, "wb") as f:
+                os.fsync(f.fileno())
+
+    def recover(self):
+        """Rewrites every record left in the journal by a crash. Call before the first write(); returns the count."""
+        try:
+            with open(self.journal_path, "rb") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return 0
+
+        recovered = 0
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn last line belongs to a batch that was never acknowledged
+                continue
+            atomic_write_json(entry["path"], entry["data"], durable=False, **entry["dump_kwargs"])
+            self.unsynced.append(entry["path"])
+            recovered += 1
+        self.checkpoint()
+        return recovered
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        self.checkpoint()
@@ -1,16 +1,16 @@
-import json
 import time
 import tkinter as tk
 from datetime import datetime
-from plyer import notification
 from tkinter import messagebox, ttk
-import pyttsx3  # Text-to-speech library
+from reminders import load_prescription, due_medicines
+from medicine_index import MedicineIndex
+from notifications import NotificationDispatcher, DesktopChannel, SpeechChannel, channels_from_env
 
 # File paths
 JSON_FILE = "data/prescriptions/prescription_20250227_164720.json"
 
-# Initialize text-to-speech engine
-tts_engine = pyttsx3.init()
+# Drug dictionary, so reminders use the same medicine names as the analysis page
+medicine_index = MedicineIndex.from_file()
 
 # Create GUI window
 root = tk.Tk()
@@ -52,27 +52,7 @@ listbox.config(yscrollcommand=scrollbar.set)
 def load_medicine_schedule():
     """Loads medicine schedule from JSON file."""
     try:
-        with open(JSON_FILE, "r") as file:
-            data = json.load(file)
-
-        medicine_schedule = {}
-
-        for med in data.get("Medicines", []):
-            name = med.get("Medicine", "Unknown Medicine")
-            timings = [t.strip() for t in med.get("Timings", [])]
-
-            formatted_timings = []
-            for t in timings:
-                if ":" not in t:
-                    formatted_timings.append(f"{int(t):02d}:00")
-                else:
-                    formatted_timings.append(t)
-
-            medicine_schedule[name] = {
-                "dosage": med.get("Dosage", "Unknown Dosage"),
-                "timings": formatted_timings
-            }
-
+        _, medicine_schedule = load_prescription(JSON_FILE, medicine_index)
         return medicine_schedule
 
     except Exception as e:
@@ -90,44 +70,24 @@ def update_medicine_list():
 
 update_medicine_list()
 
-# Function to speak the reminder
-def speak_reminder(medicine, dosage):
-    """Uses text-to-speech to remind the patient to take medicine."""
-    try:
-        name = patient_name.get()
-        reminder_text = f"Hey {name}, it's time to take your {medicine}, {dosage}"
-        
-        # Speak the reminder
-        tts_engine.say(reminder_text)
-        tts_engine.runAndWait()
-        
-        # Show message box after speaking
-        messagebox.showinfo("Medicine Alert", f"⏰ {reminder_text} ⏰")
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to speak reminder: {e}")
+# Reminders are delivered from background threads, one per channel, so a slow
+# notifier or the speech engine never stalls the Tk scheduler
+dispatcher = NotificationDispatcher([DesktopChannel(), SpeechChannel()] + channels_from_env()).start()
 
 # Function to check for medicine reminders
 def check_medicine_reminders():
     """Checks if it's time for a medicine and updates UI accordingly."""
-    schedule = load_medicine_schedule()
-    current_time = datetime.now().strftime("%H:%M")
+    root.after(30000, check_medicine_reminders)  # Check every 30 seconds, even while an alert is open
 
-    for medicine, details in schedule.items():
-        if current_time in details["timings"]:
-            message = f"Time to take {medicine} - {details['dosage']}"
-            
-            # Show notification
-            notification.notify(title="Medicine Reminder", message=message, timeout=10)
-            
-            # Update UI
-            reminder_label.config(text=message, fg="red")
-            
-            # Speak the reminder
-            speak_reminder(medicine, details["dosage"])
-
-            break  # Avoid multiple triggers at the same time
-    
-    root.after(30000, check_medicine_reminders)  # Check every 30 seconds
+    schedule = load_medicine_schedule()
+    now = datetime.now()
+    current_time = now.strftime("%H:%M")
+
+    # All doses due this minute go out as one reminder, once per day and minute
+    message = dispatcher.notify_due(patient_name.get(), due_medicines(schedule, current_time), current_time, now.date().isoformat())
+    if message:
+        reminder_label.config(text=message, fg="red")
+        messagebox.showinfo("Medicine Alert", f"⏰ {message} ⏰")
 
 # Save patient name button
 def save_patient_name():
@@ -0,0 +1,195 @@
+import concurrent.futures
+import io
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import wave
+
+import pyttsx3
+from gtts import gTTS
+
+# Text-to-speech backends for the voice assistant. Every backend returns
+# (audio_bytes, mime_type) for a piece of text. Pick one with
+# MEDICLOCK_TTS_BACKEND=piper|espeak|pyttsx3|gtts; the default "auto" uses the
+# first local engine that is available and only falls back to gTTS (which
+# calls Google's web endpoint) when there is none.
+
+# gTTS produces 32 kbit/s MP3, used to estimate clip length without decoding
+GTTS_BITRATE = 32000
+
+def split_for_speech(text, max_chars):
+    """Splits text at sentence boundaries into chunks of at most max_chars (unless a sentence is longer)."""
+    chunks = []
+    current = ""
+    for sentence in re.split(r'(?<=[.!?])\s+', text.strip()):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+class TTSBackend:
+    name = "base"
+    # Whether synthesize() may be called from several threads at once
+    thread_safe = True
+
+    def synthesize(self, text):
+        raise NotImplementedError
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+
+    def synthesize(self, text):
+        buffer = io.BytesIO()
+        gTTS(text=text, lang='en', slow=False).write_to_fp(buffer)
+        return buffer.getvalue(), "audio/mp3"
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng (or espeak) writing WAV straight to stdout."""
+
+    name = "espeak"
+
+    def __init__(self, voice="en", words_per_minute=160):
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.executable:
+            raise RuntimeError("espeak-ng is not installed")
+        self.voice = voice
+        self.words_per_minute = words_per_minute
+
+    def synthesize(self, text):
+        result = subprocess.run(
+            [self.executable, "--stdout", "-v", self.voice, "-s", str(self.words_per_minute), text],
+            capture_output=True, check=True
+        )
+        return result.stdout, "audio/wav"
+
+class Pyttsx3Backend(TTSBackend):
+    """The same local engine the reminder apps use. pyttsx3 can only render to a file.
+
+    The SAPI5 and NSSS drivers only work on the thread that created the
+    engine, so the engine lives on a worker thread of its own and every
+    synthesize() call, from whichever script thread, runs there.
+    """
+
+    name = "pyttsx3"
+    thread_safe = False
+
+    def __init__(self):
+        self.engine = None
+        self.worker = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyttsx3")
+        # Fails here, like the other backends, when no speech driver is available
+        self.worker.submit(self._init_engine).result()
+
+    def _init_engine(self):
+        self.engine = pyttsx3.init()
+
+    def _synthesize(self, text):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "speech.wav")
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with open(path, "rb") as f:
+                audio = f.read()
+        # The macOS driver writes AIFF whatever the file extension says
+        return audio, "audio/aiff" if audio[:4] == b"FORM" else "audio/wav"
+
+    def synthesize(self, text):
+        return self.worker.submit(self._synthesize, text).result()
+
+class PiperBackend(TTSBackend):
+    """Piper neural voice. The ONNX model is loaded once and kept for the life of the backend."""
+
+    name = "piper"
+
+    def __init__(self, model_path=None):
+        from piper.voice import PiperVoice
+
+        model_path = model_path or os.getenv("MEDICLOCK_PIPER_MODEL")
+        if not model_path:
+            raise RuntimeError("Set MEDICLOCK_PIPER_MODEL to a Piper .onnx voice")
+        self.voice = PiperVoice.load(model_path)
+
+    def synthesize(self, text):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_file:
+            # piper-tts renamed synthesize() to synthesize_wav() in 1.3
+            synthesize_wav = getattr(self.voice, "synthesize_wav", None) or self.voice.synthesize
+            synthesize_wav(text, wav_file)
+        return buffer.getvalue(), "audio/wav"
+
+BACKENDS = {
+    "piper": PiperBackend,
+    "espeak": EspeakBackend,
+    "pyttsx3": Pyttsx3Backend,
+    "gtts": GTTSBackend,
+}
+
+def load_backend(name=None):
+    """Creates the configured backend; "auto" tries local engines in order before gTTS."""
+    name = (name or os.getenv("MEDICLOCK_TTS_BACKEND", "auto")).lower()
+    if name != "auto":
+        return BACKENDS[name]()
+
+    for backend_class in BACKENDS.values():
+        try:
+            return backend_class()
+        except Exception:
+            continue
+    return GTTSBackend()
+
+def join_audio(clips, mime_type):
+    """Concatenates clips of one format. WAV frames are re-wrapped; MP3 frames concatenate as-is."""
+    if mime_type != "audio/wav":
+        return b"".join(clips)
+
+    output = io.BytesIO()
+    with wave.open(output, "wb") as out:
+        for i, clip in enumerate(clips):
+            with wave.open(io.BytesIO(clip), "rb") as wav:
+                if i == 0:
+                    out.setparams(wav.getparams())
+                out.writeframes(wav.readframes(wav.getnframes()))
+    return output.getvalue()
+
+def synthesize_sentences(backend, text, max_chars=80, max_workers=4):
+    """Synthesizes sentence groups in parallel and joins them into one clip."""
+    chunks = split_for_speech(text, max_chars)
+    if len(chunks) <= 1 or not backend.thread_safe:
+        return backend.synthesize(text)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(backend.synthesize, chunks))
+
+    mime_type = results[0][1]
+    return join_audio([audio for audio, _ in results], mime_type), mime_type
+
+def _aiff_duration(audio_bytes):
+    """Length of an AIFF clip from its COMM chunk (frame count and 80-bit float sample rate)."""
+    position = 12
+    while position + 8 <= len(audio_bytes):
+        chunk_id = audio_bytes[position:position + 4]
+        size = int.from_bytes(audio_bytes[position + 4:position + 8], "big")
+        if chunk_id == b"COMM":
+            frames = int.from_bytes(audio_bytes[position + 10:position + 14], "big")
+            exponent = int.from_bytes(audio_bytes[position + 16:position + 18], "big") & 0x7FFF
+            mantissa = int.from_bytes(audio_bytes[position + 18:position + 26], "big")
+            rate = mantissa * 2.0 ** (exponent - 16383 - 63)
+            return frames / rate if rate else 0.0
+        position += 8 + size + size % 2
+    raise ValueError("AIFF clip has no COMM chunk")
+
+def audio_duration(audio_bytes, mime_type):
+    """Length of a clip in seconds: exact for WAV and AIFF, estimated from the bitrate for gTTS MP3."""
+    if mime_type == "audio/aiff":
+        return _aiff_duration(audio_bytes)
+    if mime_type == "audio/wav":
+        # espeak-ng streams to stdout with a placeholder length in the header, so count the frames read
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+            frame_size = wav.getsampwidth() * wav.getnchannels()
+            return len(wav.readframes(wav.getnframes())) / frame_size / wav.getframerate()
+    return len(audio_bytes) * 8 / GTTS_BITRATE